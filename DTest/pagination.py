@@ -0,0 +1,36 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination with opaque cursors.
+
+    Pages are fetched with `WHERE <ordering> > <cursor>` instead of OFFSET,
+    so page latency doesn't depend on how deep the client has scrolled.
+    Subclasses set `ordering` to a stable, indexed column list.
+    """
+    page_size = settings.PAGINATION_PAGE_SIZE
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+    page_size_query_param = "page_size"
+    ordering = "id"
+
+
+class TeamPagination(KeysetPagination):
+    ordering = "id"
+
+
+class ThesisTopicPagination(KeysetPagination):
+    ordering = "id"
+
+
+class SupervisorPagination(KeysetPagination):
+    ordering = "user_id"
+
+
+class NotificationPagination(KeysetPagination):
+    ordering = ("-timestamp", "-id")
+
+
+class MessagePagination(KeysetPagination):
+    ordering = ("-timestamp", "-id")
@@ -2,6 +2,7 @@ from datetime import timedelta
 from pathlib import Path
 import os, dotenv
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 dotenv.load_dotenv()
 
@@ -124,16 +125,41 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Stops the chat message buffer and presence writer before the test database is dropped
+TEST_RUNNER = 'DTest.testing.TestRunner'
+
+# Cursor pagination for list endpoints (see DTest/pagination.py)
+PAGINATION_PAGE_SIZE = int(os.getenv('PAGINATION_PAGE_SIZE', 50))
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv('PAGINATION_MAX_PAGE_SIZE', 200))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),  
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),  
 }
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
-}
+# Channel layer: "memory" keeps groups inside one process (local runs and tests);
+# "redis" / "pubsub" share them between ASGI workers and servers (SERVER_MODE=asgi)
+CHANNEL_LAYER = os.getenv('CHANNEL_LAYER', 'memory')
+CHANNEL_REDIS_URL = os.getenv('CHANNEL_REDIS_URL', 'redis://127.0.0.1:6379/2')
+
+if CHANNEL_LAYER == 'memory':
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
+elif CHANNEL_LAYER in ('redis', 'pubsub'):
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer" if CHANNEL_LAYER == 'redis'
+            else "channels_redis.pubsub.RedisPubSubChannelLayer",
+            "CONFIG": {
+                "hosts": [CHANNEL_REDIS_URL],
+            },
+        },
+    }
+else:
+    raise ImproperlyConfigured(f"CHANNEL_LAYER must be memory, redis or pubsub, got {CHANNEL_LAYER!r}")
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
@@ -194,6 +220,39 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Background Excel export jobs (teams/utils/export_jobs.py)
+EXPORT_JOB_WORKERS = int(os.getenv('EXPORT_JOB_WORKERS', 1))
+
+# Chat write-behind buffer (chat/buffer.py): messages are broadcast at once and
+# written in bulk every CHAT_BUFFER_SIZE messages or CHAT_BUFFER_FLUSH_INTERVAL seconds
+CHAT_BUFFERED_WRITES = os.getenv('CHAT_BUFFERED_WRITES', 'False').lower() in ('1', 'true', 'yes')
+CHAT_BUFFER_SIZE = int(os.getenv('CHAT_BUFFER_SIZE', 200))
+CHAT_BUFFER_FLUSH_INTERVAL = float(os.getenv('CHAT_BUFFER_FLUSH_INTERVAL', 0.5))
+
+# ChatConsumer limits (chat/throttling.py): token buckets per connection, in frames per second
+CHAT_MESSAGE_RATE = float(os.getenv('CHAT_MESSAGE_RATE', 5))
+CHAT_MESSAGE_BURST = int(os.getenv('CHAT_MESSAGE_BURST', 10))
+CHAT_TYPING_RATE = float(os.getenv('CHAT_TYPING_RATE', 2))
+CHAT_TYPING_BURST = int(os.getenv('CHAT_TYPING_BURST', 5))
+# At most one typing event per user per chat is broadcast in this many seconds
+CHAT_TYPING_WINDOW = float(os.getenv('CHAT_TYPING_WINDOW', 2))
+
+# Cached chat-id set per user for WebSocket authorization (chat/membership.py);
+# entries are dropped on participant changes, the TTL only bounds staleness after missed signals
+CHAT_MEMBERSHIP_TTL = int(os.getenv('CHAT_MEMBERSHIP_TTL', 3600))
+
+# Cached unread-notification counter per user (notifications/counters.py); the entry is
+# recounted from the database once it expires, which bounds drift from concurrent updates
+NOTIFICATION_UNREAD_TTL = int(os.getenv('NOTIFICATION_UNREAD_TTL', 300))
+
+# prune_notifications: read notifications older than this many days are deleted
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+
+# Presence (chat/presence.py): a user is online while their heartbeat key lives in the
+# cache; last_seen is copied to UserStatus every PRESENCE_PERSIST_INTERVAL seconds
+PRESENCE_TTL = int(os.getenv('PRESENCE_TTL', 60))
+PRESENCE_PERSIST_INTERVAL = float(os.getenv('PRESENCE_PERSIST_INTERVAL', 30))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
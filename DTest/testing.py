@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.runner import DiscoverRunner
+
+from DTest.pagination import KeysetPagination
+
+
+class QueryPlanMixin:
+    """
+    Helpers for tests that pin down which index the database picks for a
+    hot query. Seed enough rows first: on tiny tables a full scan is the
+    right plan and says nothing about the indexes.
+    """
+
+    def analyze(self):
+        """ Refreshes planner statistics; PostgreSQL is also told to avoid sequential scans """
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+            if connection.vendor == "postgresql":
+                # Local to the test's transaction
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"{index_name} is not used:\n{plan}")
+
+
+class PaginationMixin:
+    """ Checks for list endpoints paginated with DTest.pagination.KeysetPagination """
+
+    def walk(self, client, url, page_size, key="id", between_pages=None):
+        """
+        Follows `next` links from the first page and returns the items' `key`
+        page by page. `between_pages()` runs after every page, e.g. to add rows
+        while the client is scrolling.
+        """
+        pages = []
+        response = client.get(url, {"page_size": page_size})
+        while True:
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append([item[key] for item in response.data["results"]])
+            if between_pages:
+                between_pages()
+            if not response.data["next"]:
+                return pages
+            response = client.get(response.data["next"])
+
+    def assertPageSizeClamped(self, client, url):
+        """ page_size is capped at max_page_size; an invalid one falls back to the default """
+        with mock.patch.object(KeysetPagination, "page_size", 2), \
+                mock.patch.object(KeysetPagination, "max_page_size", 3):
+            for requested, expected in ((1, 1), (1000, 3), (-5, 2), ("abc", 2)):
+                response = client.get(url, {"page_size": requested})
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertEqual(len(response.data["results"]), expected, f"page_size={requested}")
+
+
+class TestRunner(DiscoverRunner):
+    """ Stops the background writers while the test database still exists """
+
+    def teardown_databases(self, old_config, **kwargs):
+        from chat.buffer import stop_message_buffer
+        from chat.presence import stop_status_writer
+
+        stop_message_buffer()
+        stop_status_writer()
+        super().teardown_databases(old_config, **kwargs)
@@ -0,0 +1,134 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBuffer:
+    """
+    Write-behind buffer for chat messages.
+
+    ChatConsumer hands over unsaved Message instances that already carry
+    their uuid and timestamp, broadcasts them straight away and moves on.
+    A background thread writes the buffer with one bulk_create when it
+    reaches `size` messages or `interval` seconds after the first pending
+    message, whichever comes first. Whatever is still pending is written by
+    stop(), which also runs at interpreter exit (see stop_message_buffer),
+    so a graceful shutdown loses nothing.
+    """
+
+    def __init__(self, size, interval):
+        self.size = size
+        self.interval = interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._has_pending = threading.Event()
+        self._full = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, message):
+        with self._lock:
+            self._pending.append(message)
+            full = len(self._pending) >= self.size
+            self._ensure_thread()
+        self._has_pending.set()
+        if full:
+            self._full.set()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="chat-message-buffer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._has_pending.wait()
+            # Give a burst up to `interval` to fill the batch unless it is already full
+            self._full.wait(timeout=self.interval)
+            if self._stop.is_set():
+                return
+            self._has_pending.clear()
+            self._full.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Chat message buffer flush failed")
+
+    def stop(self, timeout=5):
+        """ Ends the background thread and writes what is left; returns the number of rows written """
+        self._stop.set()
+        self._has_pending.set()
+        self._full.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        self._stop.clear()
+        self._has_pending.clear()
+        self._full.clear()
+        return self.flush()
+
+    def flush(self):
+        """ Writes everything pending; returns the number of rows written """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            close_old_connections()
+            try:
+                with transaction.atomic():
+                    Message.objects.bulk_create(batch, batch_size=self.size)
+                return len(batch)
+            except DatabaseError:
+                logger.exception("Bulk write of %d chat messages failed, saving them one by one", len(batch))
+                return self._save_each(batch)
+            finally:
+                close_old_connections()
+
+    def _save_each(self, batch):
+        saved = 0
+        for message in batch:
+            try:
+                with transaction.atomic():
+                    message.save(force_insert=True)
+                saved += 1
+            except DatabaseError:
+                # Most likely the chat was deleted while the message waited in the buffer
+                logger.warning("Dropped chat message %s for chat %s", message.uuid, message.chat_id)
+        return saved
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_message_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = MessageBuffer(settings.CHAT_BUFFER_SIZE, settings.CHAT_BUFFER_FLUSH_INTERVAL)
+    return _buffer
+
+
+@atexit.register
+def stop_message_buffer():
+    """ Writes what is pending and stops the thread; the test runner calls it before dropping the database """
+    global _buffer
+    with _buffer_lock:
+        message_buffer, _buffer = _buffer, None
+    if message_buffer is not None:
+        message_buffer.stop()
@@ -1,7 +1,12 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 import json
-from chat.models import Chat, Message, UserStatus
-from django.utils import timezone
+from chat import membership, presence, receipts
+from chat.buffer import get_message_buffer
+from chat.models import Chat, Message
+from chat.serializers import UserSerializer
+from chat.throttling import TokenBucket, Coalescer
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 import asyncio
 
@@ -13,21 +18,34 @@ async def run_sync(func, *args, **kwargs):
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    # Shared by all connections in this process: one typing event per (user, chat) per window
+    typing_coalescer = Coalescer(settings.CHAT_TYPING_WINDOW)
+
     async def connect(self):
         self.user = self.scope["user"]
         self.chat_id = self.scope["url_route"]["kwargs"]["chat_id"]
         self.chat_group_name = f"chat_{self.chat_id}"
-
-        if self.user.is_authenticated:
+        self.message_bucket = TokenBucket(settings.CHAT_MESSAGE_RATE, settings.CHAT_MESSAGE_BURST)
+        self.typing_bucket = TokenBucket(settings.CHAT_TYPING_RATE, settings.CHAT_TYPING_BURST)
+        self.joined = False
+        self.last_read_id = 0
+        # Senders whose profile this connection has already received with a history page
+        self.sent_user_ids = set()
+
+        # Участие в чате проверяется по закэшированному набору chat id пользователя (chat/membership.py)
+        if self.user.is_authenticated and self.chat_id.isdigit() \
+                and await membership.ais_member(self.user.id, self.chat_id):
             await self.channel_layer.group_add(self.chat_group_name, self.channel_name)
             await self.accept()
+            self.joined = True
 
             await self.set_user_online()
         else:
             await self.close()
 
     async def disconnect(self, close_code):
-        if self.user.is_authenticated:
+        if self.joined:
+            self.typing_coalescer.forget((self.user.id, self.chat_id))
             await self.set_user_offline()
             await self.channel_layer.group_discard(self.chat_group_name, self.channel_name)
 
@@ -41,6 +59,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return
 
         if event_type == "typing":
+            # Лишние typing-кадры отбрасываются молча: и по лимиту, и внутри окна
+            if not self.typing_bucket.allow():
+                return
+            if not self.typing_coalescer.allow((self.user.id, self.chat_id)):
+                return
             await self.channel_layer.group_send(
                 self.chat_group_name,
                 {
@@ -50,12 +73,34 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
             return
 
+        if event_type == "read":
+            await self.mark_read(data)
+            return
+
+        if event_type == "history":
+            await self.send_history(data)
+            return
+
         if message:
+            # Пользователя могли удалить из чата после подключения
+            if not await membership.ais_member(self.user.id, self.chat_id):
+                await self.close(code=4003)
+                return
+            if not self.message_bucket.allow():
+                await self.send(text_data=json.dumps({
+                    "type": "error",
+                    "error": "rate_limited",
+                    "retry_after": round(self.message_bucket.retry_after(), 2),
+                }))
+                return
             msg = await self.create_message(message)
             await self.channel_layer.group_send(
                 self.chat_group_name,
                 {
                     "type": "chat_message",
+                    "id": str(msg.uuid),
+                    # В буферизованном режиме id из БД ещё нет
+                    "message_id": msg.id,
                     "message": message,
                     "sender": self.user.email,
                     "timestamp": msg.timestamp.isoformat(),
@@ -65,6 +110,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def chat_message(self, event):
         await self.send(text_data=json.dumps({
+            "id": event["id"],
+            "message_id": event.get("message_id"),
             "message": event["message"],
             "sender": event["sender"],
             "timestamp": event["timestamp"],
@@ -77,26 +124,124 @@ class ChatConsumer(AsyncWebsocketConsumer):
             "user": event["user"]
         }))
 
+    async def read_receipt(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "read",
+            "user_id": event["user_id"],
+            "user": event["user"],
+            "message_id": event["message_id"],
+        }))
+
+    async def mark_read(self, data):
+        """
+        {"type": "read", "message_id": 42} or {"type": "read", "uuid": "..."};
+        without either, everything up to the latest saved message is read.
+        An id that is not a saved message of this chat is answered with an
+        error and moves nothing.
+        """
+        message_id, message_uuid = data.get("message_id"), data.get("uuid")
+        targeted = message_id is not None or message_uuid is not None
+
+        def move_cursor():
+            chat_messages = Message.objects.filter(chat_id=self.chat_id)
+            if not targeted:
+                up_to = receipts.latest_message_id(self.chat_id)
+            elif isinstance(message_id, int) and not isinstance(message_id, bool):
+                up_to = chat_messages.filter(id=message_id).values_list("id", flat=True).first()
+            elif message_id is None and isinstance(message_uuid, str):
+                try:
+                    up_to = chat_messages.filter(uuid=message_uuid).values_list("id", flat=True).first()
+                except ValidationError:
+                    up_to = None
+            else:
+                up_to = None
+            if up_to is None:
+                return None, False
+            if up_to <= self.last_read_id:
+                return None, True
+            return receipts.mark_read(self.chat_id, self.user.id, up_to=up_to), True
+
+        cursor, found = await run_sync(move_cursor)
+        if not found:
+            # Опечатка, чужое сообщение или ещё не сохранённое из буфера — не читаем весь чат
+            await self.send(text_data=json.dumps({"type": "error", "error": "unknown_message"}))
+            return
+        if cursor is None or cursor <= self.last_read_id:
+            return
+        self.last_read_id = cursor
+        await self.channel_layer.group_send(
+            self.chat_group_name,
+            {
+                "type": "read_receipt",
+                "user_id": self.user.id,
+                "user": self.user.email,
+                "message_id": cursor,
+            }
+        )
+
+    async def send_history(self, data):
+        """
+        {"type": "history", "before": <message id>, "limit": 50} returns the
+        messages older than `before` (newest first), keyset-paged on the
+        Message (chat, id) index. Each sender's profile is sent once per
+        connection in `users`; messages refer to it by `sender_id`.
+        """
+        before = data.get("before")
+        limit = data.get("limit", settings.PAGINATION_PAGE_SIZE)
+        if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+            limit = settings.PAGINATION_PAGE_SIZE
+        limit = min(limit, settings.PAGINATION_MAX_PAGE_SIZE)
+
+        rows = Message.objects.filter(chat_id=self.chat_id)
+        if isinstance(before, int) and not isinstance(before, bool):
+            rows = rows.filter(id__lt=before)
+        rows = rows.order_by("-id").values("id", "uuid", "sender_id", "content", "timestamp", "is_read")[:limit + 1]
+
+        messages = []
+        async for row in rows:
+            messages.append({
+                "id": row["id"],
+                "uuid": str(row["uuid"]),
+                "sender_id": row["sender_id"],
+                "content": row["content"],
+                "timestamp": row["timestamp"].isoformat(),
+                "is_read": row["is_read"],
+            })
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+
+        users = {}
+        new_ids = {m["sender_id"] for m in messages} - self.sent_user_ids
+        if new_ids:
+            senders = User.objects.filter(id__in=new_ids).select_related(
+                "student_profile", "supervisor_profile", "dean_office_profile"
+            )
+            async for sender in senders:
+                users[str(sender.id)] = UserSerializer(sender).data
+            self.sent_user_ids |= new_ids
+
+        await self.send(text_data=json.dumps({
+            "type": "history",
+            "messages": messages,
+            "users": users,
+            "has_more": has_more,
+            "next_before": messages[-1]["id"] if has_more else None,
+        }))
+
     async def set_user_online(self):
-        def update_status():
-            status, _ = UserStatus.objects.get_or_create(user=self.user)
-            status.is_online = True
-            status.last_seen = timezone.now()
-            status.save()
-        await run_sync(update_status)
+        # Heartbeat lives in the cache; UserStatus is written in batches (chat/presence.py)
+        await presence.aheartbeat(self.user.id)
 
     async def set_user_offline(self):
-        def mark_offline():
-            try:
-                status = UserStatus.objects.get(user=self.user)
-                status.is_online = False
-                status.last_seen = timezone.now()
-                status.save()
-            except UserStatus.DoesNotExist:
-                pass
-        await run_sync(mark_offline)
+        await presence.awent_offline(self.user.id)
 
     async def create_message(self, content):
+        if settings.CHAT_BUFFERED_WRITES:
+            # uuid и timestamp назначаются сразу, запись в БД — пакетом из буфера
+            msg = Message(chat_id=int(self.chat_id), sender=self.user, content=content)
+            get_message_buffer().add(msg)
+            return msg
+
         def save_message():
             chat = Chat.objects.get(id=self.chat_id)
             msg = Message(chat=chat, sender=self.user, content=content)
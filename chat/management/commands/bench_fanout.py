@@ -0,0 +1,122 @@
+import asyncio
+import multiprocessing
+import queue
+import statistics
+import time
+import uuid
+
+from channels.layers import channel_layers, DEFAULT_CHANNEL_LAYER
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def listen(layer, group, listeners, ready):
+    """
+    Joins `listeners` channels to `group` and records, per message, how long
+    it took from group_send in the sender process to receive() here.
+    """
+    channels = [await layer.new_channel() for _ in range(listeners)]
+    for channel in channels:
+        await layer.group_add(group, channel)
+    ready()
+
+    latencies = []
+
+    async def drain(channel):
+        while True:
+            event = await layer.receive(channel)
+            if event["type"] == "bench.done":
+                return
+            latencies.append(time.time() - event["sent"])
+
+    try:
+        await asyncio.gather(*(drain(channel) for channel in channels))
+    finally:
+        for channel in channels:
+            await layer.group_discard(group, channel)
+    return latencies
+
+
+async def send(layer, group, messages, interval):
+    for seq in range(messages):
+        await layer.group_send(group, {"type": "bench.message", "seq": seq, "sent": time.time()})
+        if interval:
+            await asyncio.sleep(interval)
+    await layer.group_send(group, {"type": "bench.done"})
+
+
+def _worker(group, listeners, ready_queue, result_queue):
+    # A fresh layer per process: connections must not be shared across fork
+    layer = channel_layers.make_backend(DEFAULT_CHANNEL_LAYER)
+    latencies = asyncio.run(listen(layer, group, listeners, lambda: ready_queue.put(True)))
+    result_queue.put(latencies)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures cross-process fan-out latency of the channel layer: worker processes "
+        "subscribe channels to one group, this process group_sends to it. "
+        "Needs a shared layer (CHANNEL_LAYER=redis or pubsub)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Receiving processes")
+        parser.add_argument("--listeners", type=int, default=25, help="Channels per worker (≈ open sockets)")
+        parser.add_argument("--messages", type=int, default=100)
+        parser.add_argument("--interval", type=float, default=0.01, help="Seconds between sends")
+        parser.add_argument("--timeout", type=float, default=60)
+
+    def handle(self, *args, **options):
+        if settings.CHANNEL_LAYER == "memory":
+            raise CommandError("The in-memory layer can't cross processes; run with CHANNEL_LAYER=redis or pubsub.")
+
+        group = f"bench_fanout_{uuid.uuid4().hex[:8]}"
+        workers, listeners, messages = options["workers"], options["listeners"], options["messages"]
+        ctx = multiprocessing.get_context("fork")
+        ready_queue, result_queue = ctx.Queue(), ctx.Queue()
+        processes = [
+            ctx.Process(target=_worker, args=(group, listeners, ready_queue, result_queue), daemon=True)
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        try:
+            for _ in processes:
+                ready_queue.get(timeout=options["timeout"])
+
+            layer = channel_layers.make_backend(DEFAULT_CHANNEL_LAYER)
+            started = time.perf_counter()
+            asyncio.run(send(layer, group, messages, options["interval"]))
+
+            latencies = []
+            for _ in processes:
+                latencies.extend(result_queue.get(timeout=options["timeout"]))
+            elapsed = time.perf_counter() - started
+        except queue.Empty:
+            raise CommandError("Workers did not report back in time; is the channel layer reachable?")
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+        expected = workers * listeners * messages
+        self.stdout.write(f"layer:      {settings.CHANNEL_LAYERS['default']['BACKEND']}")
+        self.stdout.write(f"fan-out:    {workers} workers x {listeners} channels, {messages} messages")
+        self.stdout.write(f"delivered:  {len(latencies)}/{expected} in {elapsed:.2f}s "
+                          f"({len(latencies) / elapsed:.0f} deliveries/s)")
+        if not latencies:
+            raise CommandError("Nothing was delivered.")
+
+        latencies.sort()
+
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f"latency ms: p50={statistics.median(latencies) * 1000:.2f} p95={pct(0.95):.2f} "
+            f"p99={pct(0.99):.2f} max={latencies[-1] * 1000:.2f}"
+        )
+        if len(latencies) < expected:
+            self.stderr.write(f"{expected - len(latencies)} deliveries were lost (channel capacity or expiry).")
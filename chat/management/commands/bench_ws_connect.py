@@ -0,0 +1,63 @@
+import asyncio
+import time
+import uuid
+
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+
+from chat import membership
+from chat.consumers import ChatConsumer
+from chat.models import Chat
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulates a reconnect storm: many WebSocket connects/disconnects to ChatConsumer "
+        "in one process, with a cold and then a warm membership cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20, help="Participants of the benchmark chat")
+        parser.add_argument("--connections", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=50)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        users = [
+            CustomUser.objects.create_user(email=f"bench-ws-{tag}-{i}@example.com", role="Student")
+            for i in range(options["users"])
+        ]
+        chat = Chat.objects.create()
+        chat.participants.set(users)
+        # The signal handler drops cached sets on commit; start both runs from the same state
+        membership.invalidate([user.id for user in users])
+
+        try:
+            for label in ("cold", "warm"):
+                elapsed, accepted = asyncio.run(self.storm(chat.id, users, options))
+                if accepted != options["connections"]:
+                    raise CommandError(f"{label}: only {accepted}/{options['connections']} connections were accepted")
+                self.stdout.write(
+                    f"{label} cache: {accepted} connects in {elapsed:.2f}s ({accepted / elapsed:.0f}/s)"
+                )
+        finally:
+            chat.delete()
+            CustomUser.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    async def storm(self, chat_id, users, options):
+        app = ChatConsumer.as_asgi()
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        async def reconnect(i):
+            async with semaphore:
+                communicator = WebsocketCommunicator(app, f"/ws/chat/{chat_id}/")
+                communicator.scope["user"] = users[i % len(users)]
+                communicator.scope["url_route"] = {"kwargs": {"chat_id": str(chat_id)}}
+                connected, _ = await communicator.connect()
+                await communicator.disconnect()
+                return connected
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(reconnect(i) for i in range(options["connections"])))
+        return time.perf_counter() - started, sum(results)
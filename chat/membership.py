@@ -0,0 +1,86 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Chat
+
+KEY_PREFIX = "chat_membership:"
+
+
+def _generation_key(user_id):
+    return f"{KEY_PREFIX}gen:{user_id}"
+
+
+def _key(user_id, generation):
+    return f"{KEY_PREFIX}{user_id}:{generation}"
+
+
+def _new_generation():
+    # Random rather than counted, so a lost generation key never points back at old entries
+    return uuid.uuid4().hex
+
+
+def _generation(user_id):
+    generation = cache.get(_generation_key(user_id))
+    if generation is None:
+        cache.add(_generation_key(user_id), _new_generation(), timeout=None)
+        generation = cache.get(_generation_key(user_id))
+    return generation
+
+
+async def _ageneration(user_id):
+    generation = await cache.aget(_generation_key(user_id))
+    if generation is None:
+        await cache.aadd(_generation_key(user_id), _new_generation(), timeout=None)
+        generation = await cache.aget(_generation_key(user_id))
+    return generation
+
+
+def _chat_ids(user_id):
+    return list(Chat.objects.filter(participants=user_id).values_list("id", flat=True))
+
+
+def _load(user_id, generation):
+    # Stored under the generation read before the SELECT: if invalidate() ran in
+    # between, the entry lands under a key nobody reads any more
+    chat_ids = _chat_ids(user_id)
+    cache.set(_key(user_id, generation), chat_ids, timeout=settings.CHAT_MEMBERSHIP_TTL)
+    return set(chat_ids)
+
+
+def get_chat_ids(user_id):
+    """
+    Ids of the chats `user_id` takes part in. Served from the cache; the
+    database is read only after an invalidation (see chat/signals.py) or
+    when the entry expires.
+    """
+    generation = _generation(user_id)
+    chat_ids = cache.get(_key(user_id, generation))
+    if chat_ids is None:
+        return _load(user_id, generation)
+    return set(chat_ids)
+
+
+async def aget_chat_ids(user_id):
+    generation = await _ageneration(user_id)
+    chat_ids = await cache.aget(_key(user_id, generation))
+    if chat_ids is None:
+        return await sync_to_async(_load)(user_id, generation)
+    return set(chat_ids)
+
+
+def is_member(user_id, chat_id):
+    return int(chat_id) in get_chat_ids(user_id)
+
+
+async def ais_member(user_id, chat_id):
+    return int(chat_id) in await aget_chat_ids(user_id)
+
+
+def invalidate(user_ids):
+    """ Starts a new generation for each user; their cached sets are never read again """
+    keys = [_generation_key(user_id) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys)
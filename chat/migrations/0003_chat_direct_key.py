@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:23
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_direct_key(apps, schema_editor):
+    """
+    Gives every two-person chat its pair key. If a pair already has several
+    chats, the oldest one becomes the direct chat; the others keep their
+    messages and stay reachable through the chat list.
+    """
+    Chat = apps.get_model('chat', 'Chat')
+    Participant = Chat.participants.through
+
+    pairs = Chat.objects.annotate(n=Count('participants')).filter(n=2).values_list('id', flat=True)
+    users = {}
+    for chat_id, user_id in Participant.objects.filter(chat_id__in=pairs).values_list('chat_id', 'customuser_id'):
+        users.setdefault(chat_id, []).append(user_id)
+
+    seen = set()
+    updates = []
+    for chat_id in sorted(users):
+        low, high = sorted(users[chat_id])
+        key = f"{low}:{high}"
+        if key in seen:
+            continue
+        seen.add(key)
+        updates.append(Chat(id=chat_id, direct_key=key))
+    Chat.objects.bulk_update(updates, ['direct_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_message_message_chat_ts_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='direct_key',
+            field=models.CharField(blank=True, editable=False, max_length=41, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_direct_key, migrations.RunPython.noop),
+    ]
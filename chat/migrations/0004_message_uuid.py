@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:26
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+def fill_message_uuids(apps, schema_editor):
+    # A callable default is evaluated once for AddField, so existing rows get their own values here
+    Message = apps.get_model('chat', 'Message')
+    batch = []
+    for message in Message.objects.only('id').iterator(chunk_size=2000):
+        message.uuid = uuid.uuid4()
+        batch.append(message)
+        if len(batch) >= 2000:
+            Message.objects.bulk_update(batch, ['uuid'])
+            batch = []
+    Message.objects.bulk_update(batch, ['uuid'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_chat_direct_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='uuid',
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.RunPython(fill_message_uuids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='message',
+            name='uuid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
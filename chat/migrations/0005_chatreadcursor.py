@@ -0,0 +1,68 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Q, Subquery
+
+
+def backfill_read_cursors(apps, schema_editor):
+    """
+    Starts every participant's cursor at the last message they either sent
+    or that is already flagged is_read, so unread counts don't jump.
+    """
+    Chat = apps.get_model('chat', 'Chat')
+    Message = apps.get_model('chat', 'Message')
+    ChatReadCursor = apps.get_model('chat', 'ChatReadCursor')
+    Participant = Chat.participants.through
+
+    last_read = (
+        Message.objects.filter(chat=OuterRef('chat_id'))
+        .filter(Q(sender=OuterRef('customuser_id')) | Q(is_read=True))
+        .order_by('-id').values('id')[:1]
+    )
+    rows = Participant.objects.annotate(last_read=Subquery(last_read)).filter(last_read__isnull=False) \
+        .values_list('chat_id', 'customuser_id', 'last_read')
+    ChatReadCursor.objects.bulk_create(
+        (ChatReadCursor(chat_id=chat_id, user_id=user_id, last_read_message_id=last)
+         for chat_id, user_id, last in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_message_uuid'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatReadCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_message_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['chat', 'id'], name='message_chat_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='chatreadcursor',
+            name='chat',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_cursors', to='chat.chat'),
+        ),
+        migrations.AddField(
+            model_name='chatreadcursor',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_read_cursors', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='chatreadcursor',
+            unique_together={('chat', 'user')},
+        ),
+        migrations.RunPython(backfill_read_cursors, migrations.RunPython.noop),
+    ]
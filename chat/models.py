@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
@@ -5,6 +7,13 @@ from django.utils import timezone
 class Chat(models.Model):
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='chat_participants')
     created_at = models.DateTimeField(auto_now_add=True)
+    # "<smaller user id>:<larger user id>" for one-to-one chats, so the pair has at most one chat
+    direct_key = models.CharField(max_length=41, unique=True, null=True, blank=True, editable=False)
+
+    @staticmethod
+    def direct_key_for(user_id, other_user_id):
+        low, high = sorted((user_id, other_user_id))
+        return f"{low}:{high}"
 
     def __str__(self):
         return f"Chat {self.id} | {' & '.join([p.email for p in self.participants.all()])}"
@@ -14,13 +23,38 @@ class Message(models.Model):
     chat = models.ForeignKey(Chat, related_name='messages', on_delete=models.CASCADE)
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Assigned before the row is written, so buffered messages can be broadcast right away (see chat/buffer.py)
+    uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat', 'timestamp', 'id'], name='message_chat_ts_idx'),
+            # Unread counts are "id > read cursor" range counts within a chat
+            models.Index(fields=['chat', 'id'], name='message_chat_id_idx'),
+            # mark_read flips legacy is_read flags; only the still unread tail is indexed
+            models.Index(fields=['chat', 'id'], condition=models.Q(is_read=False), name='message_chat_unread_idx'),
+        ]
+
     def __str__(self):
         return f"Message from {self.sender.email} in Chat {self.chat.id}"
 
 
+class ChatReadCursor(models.Model):
+    """ The last message a participant has read in a chat; everything after it is unread """
+    chat = models.ForeignKey(Chat, related_name='read_cursors', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='chat_read_cursors', on_delete=models.CASCADE)
+    last_read_message_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('chat', 'user')
+
+    def __str__(self):
+        return f"{self.user.email} read Chat {self.chat_id} up to {self.last_read_message_id}"
+
+
 class UserStatus(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='status')
     is_online = models.BooleanField(default=False)
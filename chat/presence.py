@@ -0,0 +1,167 @@
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from .models import UserStatus
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "presence:"
+
+
+def _key(user_id):
+    return f"{KEY_PREFIX}{user_id}"
+
+
+def _from_ts(value):
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+
+
+class _StatusWriter:
+    """
+    Collects presence changes in memory and writes them to UserStatus in one
+    upsert every PRESENCE_PERSIST_INTERVAL seconds (and once more on stop()).
+    The database copy only serves last_seen for users who are offline.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def mark(self, user_id, is_online, last_seen):
+        with self._lock:
+            self._dirty[user_id] = (is_online, last_seen)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="presence-writer", daemon=True)
+                self._thread.start()
+
+    def pending(self, user_id):
+        return self._dirty.get(user_id)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Presence flush failed")
+
+    def stop(self, timeout=5):
+        """ Ends the background thread and writes what is left """
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        self._stop.clear()
+        return self.flush()
+
+    def flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return 0
+
+        close_old_connections()
+        try:
+            # Users deleted since their last heartbeat would fail the whole upsert
+            existing = set(get_user_model().objects.filter(pk__in=dirty).values_list("pk", flat=True))
+            UserStatus.objects.bulk_create(
+                [UserStatus(user_id=user_id, is_online=is_online, last_seen=last_seen)
+                 for user_id, (is_online, last_seen) in dirty.items() if user_id in existing],
+                update_conflicts=True,
+                unique_fields=["user"],
+                update_fields=["is_online", "last_seen"],
+            )
+        except DatabaseError:
+            logger.exception("Could not persist presence for %d users", len(dirty))
+            return 0
+        finally:
+            close_old_connections()
+        return len(dirty)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_status_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = _StatusWriter(settings.PRESENCE_PERSIST_INTERVAL)
+    return _writer
+
+
+@atexit.register
+def stop_status_writer():
+    """ Writes what is pending and stops the thread; the test runner calls it before dropping the database """
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+
+def heartbeat(user_id):
+    """ Marks the user online for PRESENCE_TTL seconds """
+    now = timezone.now()
+    cache.set(_key(user_id), now.timestamp(), timeout=settings.PRESENCE_TTL)
+    get_status_writer().mark(user_id, True, now)
+
+
+def went_offline(user_id):
+    now = timezone.now()
+    cache.delete(_key(user_id))
+    get_status_writer().mark(user_id, False, now)
+
+
+async def aheartbeat(user_id):
+    now = timezone.now()
+    await cache.aset(_key(user_id), now.timestamp(), timeout=settings.PRESENCE_TTL)
+    get_status_writer().mark(user_id, True, now)
+
+
+async def awent_offline(user_id):
+    now = timezone.now()
+    await cache.adelete(_key(user_id))
+    get_status_writer().mark(user_id, False, now)
+
+
+def get_statuses(user_ids):
+    """
+    Returns {user_id: {"is_online": bool, "last_seen": datetime}} for the
+    given users. Online users are answered from the cache; last_seen of the
+    rest comes from one UserStatus query. Users never seen are left out.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    live = cache.get_many([_key(user_id) for user_id in user_ids])
+
+    writer = _writer
+    statuses = {}
+    missing = []
+    for user_id in user_ids:
+        seen = live.get(_key(user_id))
+        if seen is not None:
+            statuses[user_id] = {"is_online": True, "last_seen": _from_ts(seen)}
+            continue
+        pending = writer.pending(user_id) if writer is not None else None
+        if pending is not None:
+            statuses[user_id] = {"is_online": False, "last_seen": pending[1]}
+        else:
+            missing.append(user_id)
+
+    if missing:
+        for user_id, last_seen in UserStatus.objects.filter(user_id__in=missing).values_list("user_id", "last_seen"):
+            statuses[user_id] = {"is_online": False, "last_seen": last_seen}
+    return statuses
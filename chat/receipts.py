@@ -0,0 +1,50 @@
+from django.db import IntegrityError, transaction
+
+from .models import ChatReadCursor, Message
+
+
+def latest_message_id(chat_id):
+    return Message.objects.filter(chat_id=chat_id).order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def mark_read(chat_id, user_id, up_to=None):
+    """
+    Marks everything in the chat up to message id `up_to` (default: the
+    latest message) as read by `user_id` and returns the cursor position.
+
+    The cursor only moves forward: one conditional UPDATE, plus an INSERT
+    the first time. Legacy `is_read` flags of the other participants'
+    messages in that range are flipped with one more UPDATE.
+    """
+    if up_to is None:
+        up_to = latest_message_id(chat_id)
+
+    with transaction.atomic():
+        moved = ChatReadCursor.objects.filter(chat_id=chat_id, user_id=user_id, last_read_message_id__lt=up_to) \
+            .update(last_read_message_id=up_to)
+        if not moved:
+            try:
+                with transaction.atomic():
+                    ChatReadCursor.objects.create(chat_id=chat_id, user_id=user_id, last_read_message_id=up_to)
+                moved = 1
+            except IntegrityError:
+                # The cursor exists and is already at or past `up_to`
+                pass
+
+        if moved:
+            Message.objects.filter(chat_id=chat_id, id__lte=up_to, is_read=False).exclude(sender_id=user_id) \
+                .update(is_read=True)
+
+    if moved:
+        return up_to
+    return read_cursor(chat_id, user_id)
+
+
+def read_cursor(chat_id, user_id):
+    return ChatReadCursor.objects.filter(chat_id=chat_id, user_id=user_id) \
+        .values_list("last_read_message_id", flat=True).first() or 0
+
+
+def unread_count(chat_id, user_id):
+    cursor = read_cursor(chat_id, user_id)
+    return Message.objects.filter(chat_id=chat_id, id__gt=cursor).exclude(sender_id=user_id).count()
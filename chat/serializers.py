@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from chat.models import Chat, Message, UserStatus
+from chat.models import Chat, ChatReadCursor, Message
 from users.models import CustomUser
 from profiles.models import StudentProfile, SupervisorProfile, DeanOfficeProfile
 
@@ -43,7 +43,7 @@ class MessageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Message
-        fields = ['id', 'sender', 'content', 'timestamp', 'is_read']
+        fields = ['id', 'uuid', 'sender', 'content', 'timestamp', 'is_read']
 
 
 class ChatSerializer(serializers.ModelSerializer):
@@ -54,7 +54,71 @@ class ChatSerializer(serializers.ModelSerializer):
         fields = ['id', 'participants', 'created_at']
 
 
-class UserStatusSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = UserStatus
-        fields = ['is_online', 'last_seen']
+class ChatListSerializer(ChatSerializer):
+    """ Chat with a preview of its last message and the requesting user's unread count """
+    last_message = serializers.SerializerMethodField()
+    unread_count = serializers.IntegerField(read_only=True)
+    last_read_message_id = serializers.IntegerField(read_only=True)
+
+    class Meta(ChatSerializer.Meta):
+        fields = ChatSerializer.Meta.fields + ['last_message', 'unread_count', 'last_read_message_id']
+
+    def get_last_message(self, obj):
+        # Filled in by chat_list_queryset()
+        if obj.last_message_id is None:
+            return None
+        return {
+            "id": obj.last_message_id,
+            "sender_id": obj.last_message_sender_id,
+            "content": obj.last_message_content,
+            "timestamp": serializers.DateTimeField().to_representation(obj.last_message_at),
+        }
+
+
+def participants_prefetch():
+    """ Loads chat participants together with the profile UserSerializer.get_profile reads """
+    from django.db.models import Prefetch
+
+    return Prefetch(
+        "participants",
+        queryset=CustomUser.objects.select_related("student_profile", "supervisor_profile", "dean_office_profile"),
+    )
+
+
+def chat_list_queryset(user):
+    """
+    The user's chats for ChatListSerializer, newest activity first.
+
+    Last message and unread count are correlated subqueries, so the whole
+    list costs two queries. Unread messages are the ones after the user's
+    read cursor: a range count on the Message (chat, id) index.
+    """
+    from django.db.models import Count, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+
+    last = Message.objects.filter(chat=OuterRef("pk")).order_by("-timestamp", "-id")
+    cursor = ChatReadCursor.objects.filter(chat=OuterRef("pk"), user=user).values("last_read_message_id")[:1]
+    unread = (
+        Message.objects.filter(chat=OuterRef("pk"), id__gt=OuterRef("last_read_message_id")).exclude(sender=user)
+        .values("chat").annotate(c=Count("id")).values("c")
+    )
+    return (
+        Chat.objects.filter(participants=user)
+        .annotate(last_read_message_id=Coalesce(Subquery(cursor), 0))
+        .annotate(
+            last_message_id=Subquery(last.values("id")[:1]),
+            last_message_sender_id=Subquery(last.values("sender_id")[:1]),
+            last_message_content=Subquery(last.values("content")[:1]),
+            last_message_at=Subquery(last.values("timestamp")[:1]),
+            unread_count=Coalesce(Subquery(unread), 0),
+        )
+        .annotate(last_activity=Coalesce("last_message_at", "created_at"))
+        .order_by("-last_activity", "-id")
+        .prefetch_related(participants_prefetch())
+    )
+
+
+class UserStatusSerializer(serializers.Serializer):
+    """ Renders a status dict from chat.presence.get_statuses (or a UserStatus row) """
+    is_online = serializers.BooleanField()
+    last_seen = serializers.DateTimeField()
@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from .membership import invalidate
+from .models import Chat
+
+
+def _invalidate_on_commit(user_ids):
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: invalidate(user_ids))
+
+
+@receiver(m2m_changed, sender=Chat.participants.through)
+def chat_participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Drops cached chat-id sets of the users whose membership changed """
+    if reverse:
+        # user.chat_participants.add(chat, ...): only this user's set changes
+        if action in ("post_add", "post_remove", "post_clear"):
+            _invalidate_on_commit([instance.pk])
+        return
+
+    if action == "pre_clear":
+        # pk_set is empty for clear(), so remember who was in the chat beforehand
+        instance._cleared_participant_ids = list(instance.participants.values_list("id", flat=True))
+    elif action == "post_clear":
+        _invalidate_on_commit(getattr(instance, "_cleared_participant_ids", []))
+    elif action in ("post_add", "post_remove"):
+        _invalidate_on_commit(pk_set or [])
+
+
+@receiver(pre_delete, sender=Chat)
+def chat_deleted(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.participants.values_list("id", flat=True))
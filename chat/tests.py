@@ -1,3 +1,415 @@
-from django.test import TestCase
+import json
+import threading
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from DTest.testing import PaginationMixin, QueryPlanMixin
+from chat import buffer, membership, presence, receipts
+from chat.consumers import ChatConsumer
+from chat.models import Chat, Message, UserStatus
+from chat.throttling import TokenBucket, Coalescer
+from users.models import CustomUser
+
+
+class ChatListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+        self.client.force_authenticate(self.user)
+        self.chats_created = 0
+
+    def add_chat(self, messages=2):
+        self.chats_created += 1
+        other = CustomUser.objects.create_user(email=f"other{self.chats_created}@example.com", role="Supervisor")
+        chat = Chat.objects.create()
+        chat.participants.set([self.user, other])
+        for i in range(messages):
+            Message.objects.create(chat=chat, sender=other, content=f"hi {i}")
+        return chat
+
+    def get_chats(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/chats/")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data, len(ctx)
+
+    def test_query_count_does_not_grow_with_chats(self):
+        self.add_chat()
+        _, before = self.get_chats()
+        for _ in range(3):
+            self.add_chat()
+        _, after = self.get_chats()
+        self.assertEqual(before, after)
+
+    def test_last_message_unread_count_and_order(self):
+        older = self.add_chat(messages=3)
+        newer = self.add_chat(messages=1)
+        Message.objects.create(chat=older, sender=self.user, content="latest")
+
+        data, _ = self.get_chats()
+        self.assertEqual([chat["id"] for chat in data], [older.id, newer.id])
+        self.assertEqual(data[0]["last_message"]["content"], "latest")
+        self.assertEqual(data[0]["unread_count"], 3)
+        self.assertEqual(data[1]["unread_count"], 1)
+
+    def test_mark_read_up_to_message(self):
+        chat = self.add_chat(messages=5)
+        third = Message.objects.filter(chat=chat).order_by("id")[2]
+
+        response = self.client.post(f"/api/chats/{chat.id}/read/", {"message_id": third.id}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["unread_count"], 2)
+        self.assertEqual(Message.objects.filter(chat=chat, is_read=True).count(), 3)
+
+        # The cursor never moves back
+        first = Message.objects.filter(chat=chat).order_by("id").first()
+        response = self.client.post(f"/api/chats/{chat.id}/read/", {"message_id": first.id}, format="json")
+        self.assertEqual(response.data["last_read_message_id"], third.id)
+
+        self.client.post(f"/api/chats/{chat.id}/read/", format="json")
+        data, _ = self.get_chats()
+        self.assertEqual(data[0]["unread_count"], 0)
+
+    def test_marking_one_message_read_moves_the_cursor(self):
+        chat = self.add_chat(messages=4)
+        second = Message.objects.filter(chat=chat).order_by("id")[1]
+
+        response = self.client.patch(f"/api/messages/{second.id}/read/")
+        self.assertEqual(response.status_code, 200, response.content)
+        data, _ = self.get_chats()
+        self.assertEqual(data[0]["unread_count"], 2)
+        self.assertEqual(data[0]["last_read_message_id"], second.id)
+
+    def test_mark_read_cost_does_not_depend_on_unread_messages(self):
+        counts = []
+        for messages in (2, 30):
+            chat = self.add_chat(messages=messages)
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(f"/api/chats/{chat.id}/read/", format="json")
+            counts.append(len(ctx))
+        self.assertEqual(counts[0], counts[1])
+
+
+class StartChatTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+        self.other = CustomUser.objects.create_user(email="other@example.com", role="Supervisor")
+
+    def start(self, user, target):
+        self.client.force_authenticate(user)
+        return self.client.post("/api/chats/start/", {"user_id": target.id}, format="json")
+
+    def test_pair_gets_one_chat_from_either_side(self):
+        created = self.start(self.user, self.other)
+        self.assertEqual(created.status_code, 201)
+        again = self.start(self.other, self.user)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.data["id"], created.data["id"])
+        self.assertEqual(Chat.objects.get().direct_key, f"{self.user.id}:{self.other.id}")
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class PresenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(presence.stop_status_writer)
+        self.online = CustomUser.objects.create_user(email="online@example.com", role="Student")
+        self.offline = CustomUser.objects.create_user(email="offline@example.com", role="Student")
+        self.unknown = CustomUser.objects.create_user(email="unknown@example.com", role="Student")
+
+    def test_bulk_status_from_cache_and_batched_writes(self):
+        presence.heartbeat(self.online.id)
+        presence.heartbeat(self.offline.id)
+        presence.went_offline(self.offline.id)
+        self.assertFalse(UserStatus.objects.exists())
+
+        ids = f"{self.online.id},{self.offline.id},{self.unknown.id}"
+        # Only the never-seen user needs a database lookup
+        with self.assertNumQueries(1):
+            data = self.client.get(f"/api/users/status/?ids={ids}").data
+        self.assertTrue(data[str(self.online.id)]["is_online"])
+        self.assertFalse(data[str(self.offline.id)]["is_online"])
+        self.assertNotIn(str(self.unknown.id), data)
+
+        presence.get_status_writer().flush()
+        self.assertEqual(
+            dict(UserStatus.objects.values_list("user_id", "is_online")),
+            {self.online.id: True, self.offline.id: False},
+        )
+
+    def test_stop_ends_the_writer_thread_and_writes_the_rest(self):
+        presence.heartbeat(self.online.id)
+        writer = presence.get_status_writer()
+        thread = writer._thread
+        self.assertTrue(thread.is_alive())
+
+        presence.stop_status_writer()
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(UserStatus.objects.get(user=self.online).is_online)
+        self.assertIsNot(presence.get_status_writer(), writer)
+
+
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.clock = lambda: self.now
+
+    def test_token_bucket_allows_burst_then_refills(self):
+        bucket = TokenBucket(rate=2, capacity=3, clock=self.clock)
+        self.assertEqual([bucket.allow() for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(bucket.retry_after(), 0.5)
+        self.now += 0.5
+        self.assertTrue(bucket.allow())
+        self.assertFalse(bucket.allow())
+
+    def test_coalescer_lets_one_event_per_window(self):
+        typing = Coalescer(window=2, clock=self.clock)
+        self.assertTrue(typing.allow((1, "7")))
+        self.assertFalse(typing.allow((1, "7")))
+        self.assertTrue(typing.allow((2, "7")))
+        self.now += 2
+        self.assertTrue(typing.allow((1, "7")))
+
+
+class MessageBufferTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+        self.chat = Chat.objects.create()
+        self.chat.participants.set([self.user])
+
+    def make_buffer(self, size=10, interval=60):
+        # No background thread: the tests call flush() themselves
+        with mock.patch.object(buffer.MessageBuffer, "_ensure_thread"):
+            return buffer.MessageBuffer(size, interval)
+
+    def message(self, content):
+        return Message(chat_id=self.chat.id, sender=self.user, content=content)
+
+    def test_flush_writes_pending_messages_in_one_insert(self):
+        messages = self.make_buffer()
+        with mock.patch.object(messages, "_ensure_thread"):
+            for i in range(3):
+                messages.add(self.message(str(i)))
+        self.assertFalse(Message.objects.exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(messages.flush(), 3)
+        self.assertEqual(sum(q["sql"].startswith("INSERT") for q in ctx.captured_queries), 1)
+        self.assertEqual(list(Message.objects.order_by("id").values_list("content", flat=True)), ["0", "1", "2"])
+        self.assertEqual(len(messages), 0)
+        self.assertEqual(messages.flush(), 0)
+
+    def test_failed_bulk_write_falls_back_to_single_rows(self):
+        existing = Message.objects.create(chat=self.chat, sender=self.user, content="saved")
+        clash = self.message("clash")
+        clash.uuid = existing.uuid
+        messages = self.make_buffer()
+        with mock.patch.object(messages, "_ensure_thread"):
+            for message in (self.message("a"), clash, self.message("b")):
+                messages.add(message)
+
+        with self.assertLogs("chat.buffer", "WARNING") as logs:
+            self.assertEqual(messages.flush(), 2)
+        self.assertEqual(len(logs.records), 2)  # the failed bulk write and the dropped message
+        self.assertEqual(set(Message.objects.values_list("content", flat=True)), {"saved", "a", "b"})
+
+    def test_exit_hook_drains_the_buffer(self):
+        messages = self.make_buffer()
+        with mock.patch.object(messages, "_ensure_thread"):
+            messages.add(self.message("last words"))
+        with mock.patch.object(buffer, "_buffer", messages):
+            buffer.stop_message_buffer()
+        self.assertTrue(Message.objects.filter(content="last words").exists())
+
+    def test_stop_ends_the_thread_before_writing(self):
+        messages = buffer.MessageBuffer(100, 60)
+        messages.add(self.message("pending"))
+        thread = messages._thread
+        self.assertTrue(thread.is_alive())
+
+        self.assertEqual(messages.stop(), 1)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(Message.objects.filter(content="pending").exists())
+
+    def test_background_flush_on_size_and_on_interval(self):
+        for size, interval, count in ((3, 60, 3), (100, 0.05, 1)):
+            messages = buffer.MessageBuffer(size, interval)
+            flushed = threading.Event()
+            with mock.patch.object(messages, "flush", side_effect=lambda: flushed.set()):
+                for i in range(count):
+                    messages.add(self.message(str(i)))
+                # A full batch skips the 60 s wait; a partial one goes after `interval`
+                self.assertTrue(flushed.wait(timeout=5), f"size={size} interval={interval}")
+
+    @override_settings(CHAT_BUFFERED_WRITES=True)
+    def test_consumer_queues_message_with_uuid_and_timestamp(self):
+        messages = self.make_buffer()
+        consumer = ChatConsumer()
+        consumer.chat_id, consumer.user = str(self.chat.id), self.user
+        with mock.patch.object(messages, "_ensure_thread"), \
+                mock.patch("chat.consumers.get_message_buffer", return_value=messages):
+            message = async_to_sync(consumer.create_message)("hello")
+
+        self.assertIsNone(message.pk)
+        self.assertIsNotNone(message.uuid)
+        self.assertIsNotNone(message.timestamp)
+        self.assertEqual(len(messages), 1)
+        self.assertFalse(Message.objects.exists())
+        messages.flush()
+        self.assertEqual(Message.objects.get().uuid, message.uuid)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class MembershipCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+        self.other = CustomUser.objects.create_user(email="other@example.com", role="Student")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chat = Chat.objects.create()
+            self.chat.participants.set([self.user, self.other])
+
+    def test_cached_until_participants_change(self):
+        self.assertTrue(membership.is_member(self.user.id, self.chat.id))
+        with self.assertNumQueries(0):
+            self.assertTrue(membership.is_member(self.user.id, self.chat.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chat.participants.remove(self.user)
+        self.assertFalse(membership.is_member(self.user.id, self.chat.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.chat_participants.add(self.chat)
+        self.assertTrue(membership.is_member(self.user.id, self.chat.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chat.participants.clear()
+        self.assertFalse(membership.is_member(self.other.id, self.chat.id))
+
+    def test_load_racing_an_invalidation_is_not_served(self):
+        real_chat_ids = membership._chat_ids
+
+        def removed_after_select(user_id):
+            chat_ids = real_chat_ids(user_id)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.chat.participants.remove(self.user)
+            return chat_ids
+
+        with mock.patch.object(membership, "_chat_ids", side_effect=removed_after_select):
+            # This read still saw the old membership...
+            self.assertTrue(membership.is_member(self.user.id, self.chat.id))
+        # ...but what it cached is not used after the invalidation
+        self.assertFalse(membership.is_member(self.user.id, self.chat.id))
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class HistoryStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+        self.other = CustomUser.objects.create_user(email="other@example.com", role="Supervisor")
+        self.chat = Chat.objects.create()
+        self.chat.participants.set([self.user, self.other])
+        for i in range(5):
+            Message.objects.create(chat=self.chat, sender=self.other if i % 2 else self.user, content=str(i))
+
+    async def test_keyset_pages_send_each_sender_once(self):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f"/ws/chat/{self.chat.id}/")
+        communicator.scope["user"] = self.user
+        communicator.scope["url_route"] = {"kwargs": {"chat_id": str(self.chat.id)}}
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        pages = []
+        before = None
+        while True:
+            await communicator.send_to(text_data=json.dumps({"type": "history", "before": before, "limit": 2}))
+            page = json.loads(await communicator.receive_from())
+            pages.append(page)
+            if not page["has_more"]:
+                break
+            before = page["next_before"]
+        await communicator.disconnect()
+
+        self.assertEqual([m["content"] for p in pages for m in p["messages"]], ["4", "3", "2", "1", "0"])
+        self.assertEqual(set(pages[0]["users"]), {str(self.user.id), str(self.other.id)})
+        self.assertTrue(all(not p["users"] for p in pages[1:]))
+        self.assertIsNone(pages[-1]["next_before"])
+
+
+class MessageIndexTests(QueryPlanMixin, TestCase):
+    def test_mark_read_scans_only_unread_messages(self):
+        users = [CustomUser.objects.create_user(email=f"user{i}@example.com", role="Student") for i in range(2)]
+        chats = [Chat.objects.create() for _ in range(10)]
+        Message.objects.bulk_create([
+            Message(chat=chat, sender=users[i % 2], content="hi", is_read=i < 190)
+            for chat in chats for i in range(200)
+        ])
+        self.analyze()
+
+        unread = Message.objects.filter(chat=chats[3], id__lte=10**9, is_read=False).exclude(sender=users[0])
+        self.assertUsesIndex(unread, "message_chat_unread_idx")
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ReadFrameTests(TransactionTestCase):
+    # The consumer saves read cursors from executor threads, which need committed rows
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+        self.other = CustomUser.objects.create_user(email="other@example.com", role="Supervisor")
+        self.chat = Chat.objects.create()
+        self.chat.participants.set([self.user, self.other])
+        self.messages = [Message.objects.create(chat=self.chat, sender=self.other, content=str(i)) for i in range(3)]
+        foreign_chat = Chat.objects.create()
+        self.foreign = Message.objects.create(chat=foreign_chat, sender=self.other, content="elsewhere")
+
+    async def test_unknown_or_foreign_target_marks_nothing(self):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f"/ws/chat/{self.chat.id}/")
+        communicator.scope["user"] = self.user
+        communicator.scope["url_route"] = {"kwargs": {"chat_id": str(self.chat.id)}}
+        await communicator.connect()
+
+        for frame in ({"message_id": self.foreign.id}, {"message_id": 10**9},
+                      {"uuid": "not-a-uuid"}, {"uuid": str(self.foreign.uuid)}):
+            await communicator.send_to(text_data=json.dumps({"type": "read", **frame}))
+            self.assertEqual(json.loads(await communicator.receive_from()), {"type": "error", "error": "unknown_message"})
+        self.assertEqual(await sync_to_async(receipts.read_cursor)(self.chat.id, self.user.id), 0)
+
+        await communicator.send_to(text_data=json.dumps({"type": "read", "message_id": self.messages[0].id}))
+        receipt = json.loads(await communicator.receive_from())
+        self.assertEqual(receipt["message_id"], self.messages[0].id)
+        await communicator.disconnect()
+
+
+class MessagePaginationTests(PaginationMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+        other = CustomUser.objects.create_user(email="other@example.com", role="Supervisor")
+        self.client.force_authenticate(self.user)
+        self.chat = Chat.objects.create()
+        self.chat.participants.set([self.user, other])
+        for i in range(7):
+            Message.objects.create(chat=self.chat, sender=other, content=str(i))
+        # Ties on timestamp must be broken by id, or pages would skip or repeat rows
+        Message.objects.filter(chat=self.chat, content__in=["2", "3", "4"]).update(
+            timestamp=Message.objects.get(chat=self.chat, content="2").timestamp
+        )
+
+    def test_cursor_round_trip_newest_first_with_timestamp_ties(self):
+        pages = self.walk(self.client, f"/api/chats/{self.chat.id}/messages/", page_size=2)
+        expected = list(Message.objects.filter(chat=self.chat).order_by("-timestamp", "-id")
+                        .values_list("id", flat=True))
+        self.assertEqual([message_id for page in pages for message_id in page], expected)
+
+    def test_page_size_is_clamped(self):
+        self.assertPageSizeClamped(self.client, f"/api/chats/{self.chat.id}/messages/")
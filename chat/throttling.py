@@ -0,0 +1,59 @@
+import time
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens and refills `rate`
+    tokens per second. Each allowed frame takes one token.
+
+    State is a couple of floats on the consumer instance, so checking a frame
+    costs no I/O at all.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def allow(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self):
+        """ Seconds until the next token is available """
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class Coalescer:
+    """
+    Lets one event per key through per `window` seconds and drops the rest.
+    Used for typing indicators: the first keystroke of a burst is broadcast,
+    the following ones within the window are not.
+    """
+
+    def __init__(self, window, clock=time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._last = {}
+
+    def allow(self, key):
+        now = self._clock()
+        last = self._last.get(key)
+        if last is not None and now - last < self.window:
+            return False
+        self._last[key] = now
+        return True
+
+    def forget(self, key):
+        self._last.pop(key, None)
@@ -1,7 +1,7 @@
 from django.urls import path
 from chat.views import (
     ChatListView, ChatDetailView, MessageListCreateView,
-    MarkMessageReadView, UserStatusView, start_or_get_chat
+    MarkMessageReadView, MarkChatReadView, UserStatusView, BulkUserStatusView, start_or_get_chat
 )
 
 urlpatterns = [
@@ -9,6 +9,8 @@ urlpatterns = [
     path("chats/<int:chat_id>/", ChatDetailView.as_view()),
     path("chats/<int:chat_id>/messages/", MessageListCreateView.as_view()),
     path("messages/<int:id>/read/", MarkMessageReadView.as_view()),
+    path("chats/<int:chat_id>/read/", MarkChatReadView.as_view()),
     path("users/<int:user_id>/status/", UserStatusView.as_view()),
+    path("users/status/", BulkUserStatusView.as_view()),
     path("chats/start/", start_or_get_chat),
 ]
@@ -5,27 +5,31 @@ from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from chat.models import Chat, Message, UserStatus
+from chat import presence, receipts
+from chat.models import Chat, Message
 from users.models import CustomUser
-from chat.serializers import ChatSerializer, MessageSerializer, UserStatusSerializer
+from chat.serializers import ChatSerializer, ChatListSerializer, MessageSerializer, UserStatusSerializer, \
+    chat_list_queryset, participants_prefetch
+from DTest.pagination import MessagePagination
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
-from datetime import timedelta
-from django.utils import timezone
 
 class ChatListView(generics.ListAPIView):
     """
     API endpoint for listing all user's chats.
     
-    Returns a list of all chats where the current user is a participant.
+    Returns a list of all chats where the current user is a participant,
+    most recently active first, each with its last message and unread count.
     """
-    serializer_class = ChatSerializer
+    serializer_class = ChatListSerializer
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
         operation_summary="List user's chats",
-        operation_description="Returns a list of all chats where the current user is a participant",
+        operation_description="Returns a list of all chats where the current user is a participant, "
+                              "with the last message and unread count, ordered by latest activity",
         responses={
-            200: ChatSerializer(many=True),
+            200: ChatListSerializer(many=True),
             401: "Authentication credentials were not provided"
         },
         security=[{'Bearer': []}]
@@ -34,7 +38,7 @@ class ChatListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        return Chat.objects.filter(participants=self.request.user)
+        return chat_list_queryset(self.request.user)
 
 
 class ChatDetailView(generics.RetrieveAPIView):
@@ -70,7 +74,7 @@ class ChatDetailView(generics.RetrieveAPIView):
         return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        return Chat.objects.filter(participants=self.request.user)
+        return Chat.objects.filter(participants=self.request.user).prefetch_related(participants_prefetch())
 
 
 class MessageListCreateView(generics.ListCreateAPIView):
@@ -82,6 +86,7 @@ class MessageListCreateView(generics.ListCreateAPIView):
     """
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MessagePagination
 
     @swagger_auto_schema(
         operation_summary="List chat messages",
@@ -132,7 +137,9 @@ class MessageListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         chat_id = self.kwargs['chat_id']
         chat = get_object_or_404(Chat, id=chat_id, participants=self.request.user)
-        return Message.objects.filter(chat=chat)
+        return Message.objects.filter(chat=chat).select_related(
+            "sender__student_profile", "sender__supervisor_profile", "sender__dean_office_profile"
+        )
 
     def perform_create(self, serializer):
         chat = get_object_or_404(Chat, id=self.kwargs['chat_id'], participants=self.request.user)
@@ -180,11 +187,55 @@ class MarkMessageReadView(APIView):
     )
     def patch(self, request, id):
         msg = get_object_or_404(Message, id=id, chat__participants=request.user)
-        msg.is_read = True
-        msg.save()
+        # Тот же курсор, что и у /chats/<id>/read/, иначе счётчик непрочитанных в списке чатов не уменьшится
+        receipts.mark_read(msg.chat_id, request.user.id, up_to=msg.id)
         return Response({"status": "marked as read"})
 
 
+class MarkChatReadView(APIView):
+    """
+    API endpoint for marking a chat read up to a message.
+
+    Moves the user's read cursor forward in one UPDATE, so opening a chat
+    costs one request no matter how many messages were unread.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Mark chat read up to a message",
+        operation_description="Marks every message up to `message_id` (default: the latest one) as read",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'message_id': openapi.Schema(type=openapi.TYPE_INTEGER, description="Last read message id")
+            }
+        ),
+        responses={
+            200: "Read cursor and remaining unread count",
+            400: "Bad Request - Invalid message_id",
+            401: "Authentication credentials were not provided",
+            404: "Chat or message not found"
+        },
+        security=[{'Bearer': []}]
+    )
+    def post(self, request, chat_id):
+        get_object_or_404(Chat, id=chat_id, participants=request.user)
+
+        message_id = request.data.get("message_id")
+        if message_id is not None:
+            if not isinstance(message_id, int) or isinstance(message_id, bool):
+                return Response({"error": "message_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            if not Message.objects.filter(chat_id=chat_id, id=message_id).exists():
+                return Response({"error": "Message not found in this chat"}, status=status.HTTP_404_NOT_FOUND)
+
+        cursor = receipts.mark_read(chat_id, request.user.id, up_to=message_id)
+        return Response({
+            "chat_id": chat_id,
+            "last_read_message_id": cursor,
+            "unread_count": receipts.unread_count(chat_id, request.user.id),
+        })
+
+
 class UserStatusView(APIView):
     """
     API endpoint for retrieving a user's online status.
@@ -219,20 +270,53 @@ class UserStatusView(APIView):
         }
     )
     def get(self, request, user_id):
-        status = get_object_or_404(UserStatus, user__id=user_id)
-        serializer = UserStatusSerializer(status)
-        data = serializer.data
+        # Онлайн-статус берётся из кэша (heartbeat с TTL), last_seen офлайн-пользователя — из UserStatus
+        found = presence.get_statuses([user_id])
+        if user_id not in found:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(UserStatusSerializer(found[user_id]).data)
 
-        now = timezone.now()
-        last_seen = status.last_seen
 
-        # Если прошло больше 60 секунд с момента последнего пинга
-        if now - last_seen > timedelta(seconds=60):
-            data["is_online"] = False
-        else:
-            data["is_online"] = True
+class BulkUserStatusView(APIView):
+    """
+    API endpoint for the online status of many users at once.
 
-        return Response(data)
+    Takes a comma-separated `ids` list, so a chat list can show every
+    participant's status with one request.
+    """
+    MAX_IDS = 200
+
+    @swagger_auto_schema(
+        operation_summary="Get online status of several users",
+        operation_description="Returns {user_id: {is_online, last_seen}} for the given ids; "
+                              "users that have never connected are omitted",
+        manual_parameters=[
+            openapi.Parameter(
+                'ids',
+                openapi.IN_QUERY,
+                description="Comma-separated user ids (at most 200)",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+        ],
+        responses={
+            200: "Map of user id to status",
+            400: "Bad Request - Missing or invalid ids"
+        }
+    )
+    def get(self, request):
+        try:
+            ids = [int(value) for value in request.query_params.get("ids", "").split(",") if value.strip()]
+        except ValueError:
+            return Response({"error": "ids must be a comma-separated list of integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({"error": "ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.MAX_IDS:
+            return Response({"error": f"At most {self.MAX_IDS} ids per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        statuses = presence.get_statuses(ids)
+        return Response({str(user_id): UserStatusSerializer(data).data for user_id, data in statuses.items()})
 
 @swagger_auto_schema(
     method='post',
@@ -276,18 +360,24 @@ def start_or_get_chat(request):
         return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
     current_user = request.user
+    if target_user == current_user:
+        return Response({"error": "You can't start a chat with yourself"}, status=status.HTTP_400_BAD_REQUEST)
+
+    key = Chat.direct_key_for(current_user.id, target_user.id)
+    chats = Chat.objects.prefetch_related(participants_prefetch())
 
-    # Поиск существующего чата с этими двумя участниками
-    existing_chats = Chat.objects.filter(participants=current_user).filter(participants=target_user)
-    for chat in existing_chats:
-        if chat.participants.count() == 2:
-            serializer = ChatSerializer(chat)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+    # Поиск существующего чата по ключу пары — один запрос по уникальному индексу
+    existing_chat = chats.filter(direct_key=key).first()
+    if existing_chat:
+        return Response(ChatSerializer(existing_chat).data, status=status.HTTP_200_OK)
 
-    # Чата нет — создаём новый
-    new_chat = Chat.objects.create()
-    new_chat.participants.set([current_user, target_user])
-    new_chat.save()
+    # Чата нет — создаём новый; параллельный запрос упрётся в уникальный ключ
+    try:
+        with transaction.atomic():
+            new_chat = Chat.objects.create(direct_key=key)
+            new_chat.participants.set([current_user, target_user])
+    except IntegrityError:
+        return Response(ChatSerializer(chats.get(direct_key=key)).data, status=status.HTTP_200_OK)
 
-    serializer = ChatSerializer(new_chat)
+    serializer = ChatSerializer(chats.get(pk=new_chat.pk))
     return Response(serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
@@ -11,6 +11,20 @@ python manage.py migrate
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+WORKERS=${WEB_CONCURRENCY:-3}
+
+# SERVER_MODE=asgi serves HTTP and WebSockets from uvicorn workers managed by Gunicorn.
+# With more than one worker the channel layer must be shared (CHANNEL_LAYER=redis or pubsub),
+# otherwise a notification sent by one worker never reaches sockets held by another.
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    if [ "$WORKERS" -gt 1 ] && [ "${CHANNEL_LAYER:-memory}" = "memory" ]; then
+        echo "CHANNEL_LAYER=memory can't be shared by $WORKERS workers; set CHANNEL_LAYER=redis or pubsub." >&2
+        exit 1
+    fi
+    echo "Starting Gunicorn with $WORKERS uvicorn workers (ASGI) on port ${PORT:-8000}..."
+    exec gunicorn -w "$WORKERS" -k uvicorn.workers.UvicornWorker -b 0.0.0.0:${PORT:-8000} DTest.asgi:application
+fi
+
 # Start Gunicorn server
 echo "Starting Gunicorn on port ${PORT:-8000}..."
-exec gunicorn -w 3 -b 0.0.0.0:${PORT:-8000} DTest.wsgi:application
+exec gunicorn -w "$WORKERS" -b 0.0.0.0:${PORT:-8000} DTest.wsgi:application
@@ -1,21 +1,45 @@
 import json
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from notifications import counters
 from notifications.models import Notification
 
 User = get_user_model()
 
 
+def _parse_id(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
 class NotificationConsumer(AsyncWebsocketConsumer):
     """ WebSocket Consumer to handle real-time notifications """
 
     async def connect(self):
         """ Connect the user to the WebSocket """
         self.user = self.scope["user"]
+        # Ids sent by replay; the live event for the same row is dropped once.
+        # A set, not a high-water mark: concurrent transactions may commit ids out of order
+        self.replayed_ids = set()
         if self.user.is_authenticated:
             self.group_name = f"user_{self.user.id}"
+            # Join the group before replaying, so nothing created in between is lost;
+            # live events queue up until connect returns and are then deduplicated by id
             await self.channel_layer.group_add(self.group_name, self.channel_name)
             await self.accept()
+            # After this the counter is pushed only when it changes
+            await self.send(text_data=json.dumps({
+                "type": "unread_count",
+                "unread_count": await counters.aunread_count(self.user.id),
+            }))
+            last_id = _parse_id(parse_qs(self.scope["query_string"].decode()).get("last_id", [None])[0])
+            if last_id is not None:
+                await self.replay(last_id)
         else:
             await self.close()
 
@@ -25,10 +49,59 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     async def receive(self, text_data):
-        """ Handle incoming messages (not needed for notifications) """
-        pass
+        """ Handle {"type": "sync", "last_id": N}: replay notifications newer than N """
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(data, dict) or data.get("type") != "sync":
+            return
+        last_id = _parse_id(data.get("last_id"))
+        if last_id is not None:
+            await self.replay(last_id)
+
+    async def replay(self, last_id):
+        """
+        Sends the user's notifications with id > last_id, oldest first, in the
+        same format as live ones, then a "synced" frame. At most
+        PAGINATION_MAX_PAGE_SIZE rows are sent; with has_more the client
+        sends another sync from the returned last_id.
+        """
+        limit = settings.PAGINATION_MAX_PAGE_SIZE
+        rows = Notification.objects.filter(user_id=self.user.id, id__gt=last_id).order_by("id") \
+            .values("id", "message", "is_read", "timestamp")[:limit + 1]
+
+        sent = 0
+        has_more = False
+        async for row in rows:
+            if sent == limit:
+                has_more = True
+                break
+            await self.send(text_data=json.dumps({
+                "type": "notification",
+                "id": row["id"],
+                "message": row["message"],
+                "is_read": row["is_read"],
+                "timestamp": row["timestamp"].isoformat(),
+            }))
+            self.replayed_ids.add(row["id"])
+            last_id = row["id"]
+            sent += 1
+
+        await self.send(text_data=json.dumps({"type": "synced", "last_id": last_id, "has_more": has_more}))
 
     async def send_notification(self, event):
         """ Send a real-time notification to the user """
-        message = event["message"]
-        await self.send(text_data=json.dumps({"message": message}))
\ No newline at end of file
+        notification_id = event.get("id")
+        if notification_id in self.replayed_ids:
+            self.replayed_ids.discard(notification_id)
+            return
+        await self.send(text_data=json.dumps({
+            "type": "notification",
+            "id": notification_id,
+            "message": event["message"],
+        }))
+
+    async def unread_count(self, event):
+        """ Send the new number of unread notifications """
+        await self.send(text_data=json.dumps({"type": "unread_count", "unread_count": event["unread_count"]}))
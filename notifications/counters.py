@@ -0,0 +1,74 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Notification
+
+KEY_PREFIX = "notifications_unread:"
+
+
+def _key(user_id):
+    return f"{KEY_PREFIX}{user_id}"
+
+
+def _load(user_id):
+    count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+    cache.set(_key(user_id), count, timeout=settings.NOTIFICATION_UNREAD_TTL)
+    return count
+
+
+def unread_count(user_id):
+    """
+    Number of unread notifications of `user_id`, served from the cache.
+    The entry is recounted from the database when it is missing, which also
+    happens every NOTIFICATION_UNREAD_TTL seconds, so any drift from races
+    between the counter and the table does not outlive the TTL.
+    """
+    count = cache.get(_key(user_id))
+    if count is None:
+        return _load(user_id)
+    return count
+
+
+async def aunread_count(user_id):
+    count = await cache.aget(_key(user_id))
+    if count is None:
+        return await sync_to_async(_load)(user_id)
+    return count
+
+
+def increment(counts):
+    """
+    Adds {user_id: n} to the cached counters and returns the new values.
+    Users without a cached counter are skipped; theirs is recounted on the
+    next read anyway.
+    """
+    updated = {}
+    for user_id, n in counts.items():
+        try:
+            updated[user_id] = cache.incr(_key(user_id), n)
+        except ValueError:
+            pass
+    return updated
+
+
+def decrement(user_id):
+    """ Returns the new count, or None if the counter was not cached """
+    try:
+        count = cache.decr(_key(user_id))
+    except ValueError:
+        return None
+    if count < 0:
+        cache.delete(_key(user_id))
+        return None
+    return count
+
+
+def reset(user_id):
+    cache.set(_key(user_id), 0, timeout=settings.NOTIFICATION_UNREAD_TTL)
+
+
+def invalidate(user_ids):
+    keys = [_key(user_id) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from notifications import counters
+from notifications.models import DIGEST_MESSAGES, Notification
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes read notifications older than NOTIFICATION_RETENTION_DAYS and collapses "
+        "unread notifications sharing a digest_key into one digest row. Work is done in "
+        "chunks of --batch-size rows, each in its own short transaction, so it is safe to "
+        "run from cron while the site is live."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help="Age in days after which read notifications are deleted")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--no-digest", action="store_true", help="Only delete old notifications")
+
+    def handle(self, *args, **options):
+        if options["days"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--days must be >= 0 and --batch-size >= 1.")
+
+        deleted = self.delete_old(timezone.now() - timedelta(days=options["days"]), options["batch_size"])
+        self.stdout.write(f"Deleted {deleted} read notifications older than {options['days']} days.")
+
+        if not options["no_digest"]:
+            groups, collapsed = self.collapse(options["batch_size"])
+            self.stdout.write(f"Collapsed {collapsed} notifications into {groups} digests.")
+
+    def delete_old(self, cutoff, batch_size):
+        """ Deletes by primary key in chunks, so no single statement locks the whole range """
+        old = Notification.objects.filter(is_read=True, timestamp__lt=cutoff)
+        deleted = 0
+        while True:
+            ids = list(old.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += Notification.objects.filter(id__in=ids).delete()[0]
+
+    def collapse(self, batch_size):
+        """
+        For every (user, digest_key) with several unread rows, the newest row
+        becomes the digest and the older ones are deleted. Affected unread
+        counters are dropped from the cache and recounted on the next read.
+        """
+        groups = Notification.objects.filter(is_read=False).exclude(digest_key="") \
+            .values("user_id", "digest_key") \
+            .annotate(rows=Count("id"), total=Sum("count"), newest=Max("id")) \
+            .filter(rows__gt=1).order_by()
+
+        digests = 0
+        collapsed = 0
+        batch = []
+        for group in groups.iterator(chunk_size=batch_size):
+            batch.append(group)
+            if len(batch) == batch_size:
+                batch_digests, batch_collapsed = self._collapse_batch(batch)
+                digests += batch_digests
+                collapsed += batch_collapsed
+                batch = []
+        if batch:
+            batch_digests, batch_collapsed = self._collapse_batch(batch)
+            digests += batch_digests
+            collapsed += batch_collapsed
+        return digests, collapsed
+
+    def _collapse_batch(self, batch):
+        """
+        Returns (digests, collapsed). Groups without a digest message, or whose
+        rows were read or deleted since the grouping query, count for neither.
+        """
+        digests = 0
+        collapsed = 0
+        changed_users = set()
+        with transaction.atomic():
+            for group in batch:
+                template = DIGEST_MESSAGES.get(group["digest_key"].split(":", 1)[0])
+                if template is None:
+                    continue
+                deleted = Notification.objects.filter(
+                    user_id=group["user_id"], digest_key=group["digest_key"],
+                    is_read=False, id__lt=group["newest"],
+                ).delete()[0]
+                if not deleted:
+                    continue
+                Notification.objects.filter(pk=group["newest"]).update(
+                    message=template.format(count=group["total"]),
+                    count=group["total"],
+                )
+                digests += 1
+                collapsed += deleted
+                changed_users.add(group["user_id"])
+            if changed_users:
+                transaction.on_commit(lambda: counters.invalidate(changed_users))
+        return digests, collapsed
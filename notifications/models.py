@@ -1,12 +1,34 @@
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
 
+# Digest message per digest_key prefix; {count} is the number of collapsed notifications
+DIGEST_MESSAGES = {
+    "join_request": "{count} students want to join your team.",
+    "supervisor_request": "{count} teams request you as supervisor.",
+}
+
 class Notification(models.Model):
     """ Stores notifications for users """
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="notifications")
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Notifications with the same non-empty key, e.g. "join_request:<team id>", are
+    # collapsed into one digest row by prune_notifications; `count` is how many it stands for
+    digest_key = models.CharField(max_length=64, blank=True, default="")
+    count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp', 'id'], name='notification_user_ts_idx'),
+            # Replay of missed notifications on WebSocket reconnect (id > last_id)
+            models.Index(fields=['user', 'id'], name='notification_user_id_idx'),
+            # Unread counter recount and digest grouping only look at unread rows
+            models.Index(fields=['user', 'digest_key'], condition=Q(is_read=False), name='notification_unread_idx'),
+            # prune_notifications: read rows past the retention age
+            models.Index(fields=['timestamp'], condition=Q(is_read=True), name='notification_read_ts_idx'),
+        ]
 
     def __str__(self):
         return f"Notification for {self.user.email}: {self.message}"
\ No newline at end of file
@@ -0,0 +1,192 @@
+import asyncio
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from . import counters
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+def _event(notification):
+    return {
+        "type": "send_notification",
+        "id": notification.id,
+        "message": notification.message,
+    }
+
+
+async def _send_in_order(channel_layer, group, events):
+    for event in events:
+        try:
+            await channel_layer.group_send(group, event)
+        except Exception as e:
+            logger.warning("Failed to push notification: %s", e)
+
+
+async def _push_all(events):
+    """ Groups run concurrently; each group's events are sent one after another, in order """
+    channel_layer = get_channel_layer()
+    by_group = {}
+    for group, event in events:
+        by_group.setdefault(group, []).append(event)
+    await asyncio.gather(*(_send_in_order(channel_layer, group, group_events)
+                           for group, group_events in by_group.items()))
+
+
+def _push(events):
+    # Under ASGI, async_to_sync runs the sends on the server's event loop, the one
+    # the consumers live on, so the in-memory channel layer works with one worker.
+    # A private loop on another thread would not reach them.
+    try:
+        async_to_sync(_push_all)(events)
+    except Exception:
+        logger.exception("Notification dispatch failed")
+
+
+class _Dispatcher:
+    """
+    A long-lived thread with its own event loop that sends pushes through a
+    shared (Redis) channel layer, so the committing request does not wait for
+    the round trip. Batches are sent one after another, in submit order.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="notification-dispatch", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        self._loop.run_until_complete(self._consume())
+        self._loop.close()
+
+    async def _consume(self):
+        while True:
+            events = await self._queue.get()
+            if events is None:
+                return
+            try:
+                await _push_all(events)
+            except Exception:
+                logger.exception("Notification dispatch failed")
+
+    def submit(self, events):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, events)
+
+    def stop(self, timeout=5):
+        """ Sends what is queued, then ends the thread """
+        self.submit(None)
+        self._thread.join(timeout)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = _Dispatcher()
+    return _dispatcher
+
+
+@atexit.register
+def stop_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        dispatcher.stop()
+
+
+def _count_event(count):
+    return {
+        "type": "unread_count",
+        "unread_count": count,
+    }
+
+
+def dispatch(notifications, unread=None):
+    """
+    Sends saved notifications to their users' WebSocket groups in one batch,
+    each user's followed by their new unread count from `unread` ({user_id: count}).
+    Call it after commit.
+
+    With the in-memory layer the sends run in the calling thread, since the
+    consumers are only reachable from the server's own loop. A shared layer
+    gets them from the dispatcher thread, and the caller returns at once.
+    """
+    events = [(f"user_{n.user_id}", _event(n)) for n in notifications]
+    events += [(f"user_{user_id}", _count_event(count)) for user_id, count in (unread or {}).items()]
+    if not events:
+        return
+    if settings.CHANNEL_LAYER == "memory":
+        _push(events)
+    else:
+        get_dispatcher().submit(events)
+
+
+def push_unread_count(user_id, count):
+    """ Pushes a changed unread counter after the current transaction commits """
+    if count is not None:
+        transaction.on_commit(lambda: dispatch([], {user_id: count}))
+
+
+def _created(notifications):
+    unread = counters.increment(Counter(n.user_id for n in notifications))
+    dispatch(notifications, unread)
+
+
+class NotificationOutbox:
+    """
+    Collects notifications produced while handling a request.
+
+    Rows are written with one bulk_create inside the caller's transaction, so
+    they commit or roll back together with the change they describe. The
+    WebSocket push is scheduled with on_commit, so nothing is sent for a
+    transaction that rolls back. Different users' sends run concurrently, and
+    each user's events are sent in order.
+
+        with transaction.atomic(), NotificationOutbox() as outbox:
+            outbox.add(user, "Your request was accepted.")
+    """
+
+    def __init__(self):
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._pending = []
+        return False
+
+    def add(self, user, message, digest_key=""):
+        """ `user` is a user instance or a user id; see Notification.digest_key """
+        user_id = getattr(user, "pk", user)
+        self._pending.append(Notification(user_id=user_id, message=message, digest_key=digest_key))
+
+    def flush(self):
+        if not self._pending:
+            return []
+        notifications, self._pending = self._pending, []
+        created = Notification.objects.bulk_create(notifications)
+        transaction.on_commit(lambda: _created(created))
+        return created
@@ -4,4 +4,4 @@ from .models import Notification
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['id', 'message', 'is_read', 'timestamp']
+        fields = ['id', 'message', 'is_read', 'timestamp', 'count']
@@ -1,3 +1,254 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from DTest.testing import PaginationMixin, QueryPlanMixin
+from notifications import counters, outbox as outbox_module
+from notifications.consumers import NotificationConsumer
+from notifications.models import Notification
+from notifications.outbox import NotificationOutbox
+from teams.views import send_notification
+from users.models import CustomUser
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class OutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [CustomUser.objects.create_user(email=f"user{i}@example.com", role="Student") for i in range(3)]
+        self.layer = mock.Mock(group_send=mock.AsyncMock())
+        patcher = mock.patch("notifications.outbox.get_channel_layer", return_value=self.layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sent(self):
+        return [call.args for call in self.layer.group_send.call_args_list]
+
+    def test_rows_in_one_insert_and_pushed_only_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with CaptureQueriesContext(connection) as ctx, transaction.atomic(), NotificationOutbox() as outbox:
+                for user in self.users:
+                    outbox.add(user, f"hello {user.email}")
+            self.assertEqual(sum(q["sql"].startswith("INSERT") for q in ctx.captured_queries), 1)
+            # Nothing is sent before commit
+            self.layer.group_send.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+
+        notifications = Notification.objects.order_by("id")
+        self.assertEqual(self.sent(), [
+            (f"user_{n.user_id}", {"type": "send_notification", "id": n.id, "message": n.message})
+            for n in notifications
+        ])
+
+    def test_rollback_sends_and_saves_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic(), NotificationOutbox() as outbox:
+                outbox.add(self.users[0], "never")
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Notification.objects.exists())
+        self.layer.group_send.assert_not_called()
+
+    def test_send_notification_saves_and_pushes_with_counter(self):
+        user = self.users[0]
+        counters.unread_count(user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            send_notification(user, "Your request was accepted.", digest_key="join_request:1")
+
+        notification = Notification.objects.get()
+        self.assertEqual((notification.user_id, notification.digest_key), (user.id, "join_request:1"))
+        self.assertEqual(self.sent(), [
+            (f"user_{user.id}", {"type": "send_notification", "id": notification.id,
+                                 "message": "Your request was accepted."}),
+            (f"user_{user.id}", {"type": "unread_count", "unread_count": 1}),
+        ])
+
+    @override_settings(CHANNEL_LAYER="redis")
+    def test_shared_layer_pushes_from_dispatcher_in_order(self):
+        self.addCleanup(outbox_module.stop_dispatcher)
+        gate = threading.Event()
+        sent = []
+
+        async def group_send(group, event):
+            # Held until the request side has returned
+            for _ in range(500):
+                if gate.is_set():
+                    break
+                await asyncio.sleep(0.01)
+            sent.append((group, event["type"]))
+
+        self.layer.group_send.side_effect = group_send
+        for user in self.users[:2]:
+            counters.unread_count(user.id)
+        with self.captureOnCommitCallbacks(execute=True), NotificationOutbox() as outbox:
+            for user in self.users[:2]:
+                outbox.add(user, "hello")
+        self.assertEqual(sent, [])
+
+        gate.set()
+        outbox_module.stop_dispatcher()
+        for user in self.users[:2]:
+            self.assertEqual([kind for group, kind in sent if group == f"user_{user.id}"],
+                             ["send_notification", "unread_count"])
+
+    def test_channel_layer_failure_does_not_break_the_request(self):
+        self.layer.group_send.side_effect = ConnectionError("layer down")
+        with self.captureOnCommitCallbacks(execute=True):
+            send_notification(self.users[0], "still saved")
+        self.assertTrue(Notification.objects.filter(message="still saved").exists())
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, n):
+        with self.captureOnCommitCallbacks(execute=True), NotificationOutbox() as outbox:
+            for i in range(n):
+                outbox.add(self.user, f"note {i}")
+
+    def unread(self):
+        return self.client.get("/api/notifications/unread/").json()["unread_count"]
+
+    def test_counter_follows_create_delete_and_mark_all(self):
+        self.notify(2)
+        self.assertEqual(self.unread(), 2)
+
+        self.notify(3)
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.unread_count(self.user.id), 5)
+
+        notification = self.user.notifications.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/notifications/{notification.id}/")
+        self.assertEqual(self.unread(), 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch("/api/notifications/mark-all-as-read/")
+        self.assertEqual(self.unread(), 0)
+
+        cache.clear()
+        self.assertEqual(self.unread(), 0)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ReplayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+        self.notifications = [Notification.objects.create(user=self.user, message=f"note {i}") for i in range(4)]
+
+    async def test_reconnect_replays_only_newer_and_drops_duplicate_live_event(self):
+        last_seen = self.notifications[1].id
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), f"/ws/notifications/?last_id={last_seen}")
+        communicator.scope["user"] = self.user
+        await communicator.connect()
+
+        frames = [json.loads(await communicator.receive_from()) for _ in range(4)]
+        self.assertEqual(frames[0]["type"], "unread_count")
+        self.assertEqual([f["message"] for f in frames[1:3]], ["note 2", "note 3"])
+        self.assertEqual(frames[3], {"type": "synced", "last_id": self.notifications[3].id, "has_more": False})
+
+        await communicator.send_input({"type": "send_notification", "id": self.notifications[3].id, "message": "note 3"})
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class PruneNotificationsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+
+    def test_old_read_rows_deleted_and_repeats_collapsed(self):
+        old = Notification.objects.create(user=self.user, message="old", is_read=True)
+        Notification.objects.filter(pk=old.pk).update(timestamp=timezone.now() - timedelta(days=100))
+        recent_read = Notification.objects.create(user=self.user, message="recent", is_read=True)
+        for i in range(3):
+            Notification.objects.create(user=self.user, message=f"student {i} wants to join your team.",
+                                        digest_key="join_request:1")
+        other_team = Notification.objects.create(user=self.user, message="x wants to join your team.",
+                                                 digest_key="join_request:2")
+        self.assertEqual(counters.unread_count(self.user.id), 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("prune_notifications", days=90, batch_size=1, stdout=StringIO())
+
+        remaining = list(self.user.notifications.order_by("id"))
+        self.assertNotIn(old, remaining)
+        self.assertIn(recent_read, remaining)
+        self.assertIn(other_team, remaining)
+        digest = [n for n in remaining if n.digest_key == "join_request:1"]
+        self.assertEqual(len(digest), 1)
+        self.assertEqual((digest[0].count, digest[0].message), (3, "3 students want to join your team."))
+        self.assertEqual(counters.unread_count(self.user.id), 2)
+
+    def test_reported_counts_match_the_database(self):
+        for key, n in (("join_request:1", 3), ("supervisor_request:7", 2), ("unknown:1", 2)):
+            for i in range(n):
+                Notification.objects.create(user=self.user, message=f"{key} {i}", digest_key=key)
+        before = Notification.objects.count()
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("prune_notifications", batch_size=2, stdout=out)
+
+        digests = Notification.objects.filter(count__gt=1)
+        self.assertEqual(sorted(digests.values_list("digest_key", flat=True)), ["join_request:1", "supervisor_request:7"])
+        # Keys without a digest message are left alone and not reported
+        self.assertEqual(Notification.objects.filter(digest_key="unknown:1").count(), 2)
+        self.assertIn(f"Collapsed {before - Notification.objects.count()} notifications into {digests.count()} digests.",
+                      out.getvalue())
+        self.assertIn("Collapsed 3 notifications into 2 digests.", out.getvalue())
+
+
+class NotificationIndexTests(QueryPlanMixin, TestCase):
+    def setUp(self):
+        users = [CustomUser.objects.create_user(email=f"user{i}@example.com", role="Student") for i in range(20)]
+        Notification.objects.bulk_create([
+            Notification(user=user, message="note", is_read=i % 10 != 0) for user in users for i in range(50)
+        ])
+        self.user = users[0]
+        self.analyze()
+
+    def test_unread_count_uses_partial_index(self):
+        self.assertUsesIndex(Notification.objects.filter(user=self.user, is_read=False), "notification_unread_idx")
+
+    def test_retention_uses_read_timestamp_index(self):
+        old = Notification.objects.filter(is_read=True, timestamp__lt=timezone.now() - timedelta(days=90))
+        self.assertUsesIndex(old, "notification_read_ts_idx")
+
+
+class NotificationPaginationTests(PaginationMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email="me@example.com", role="Student")
+        self.client.force_authenticate(self.user)
+        notifications = [Notification.objects.create(user=self.user, message=f"note {i}") for i in range(7)]
+        Notification.objects.filter(pk__in=[n.pk for n in notifications[1:5]]).update(
+            timestamp=notifications[1].timestamp
+        )
+
+    def test_cursor_round_trip_newest_first_with_timestamp_ties(self):
+        pages = self.walk(self.client, "/api/notifications/", page_size=3)
+        expected = list(self.user.notifications.order_by("-timestamp", "-id").values_list("id", flat=True))
+        self.assertEqual([n for page in pages for n in page], expected)
+
+    def test_page_size_is_clamped(self):
+        self.assertPageSizeClamped(self.client, "/api/notifications/")
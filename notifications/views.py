@@ -5,7 +5,10 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from DTest.pagination import NotificationPagination
+from . import counters
 from .models import Notification
+from .outbox import push_unread_count
 from .serializers import NotificationSerializer
 from django.shortcuts import get_object_or_404
 
@@ -28,9 +31,11 @@ class NotificationListView(APIView):
         security=[{'Bearer': []}]
     )
     def get(self, request):
-        notifications = Notification.objects.filter(user=request.user).order_by('-timestamp')
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data)
+        notifications = Notification.objects.filter(user=request.user)
+        paginator = NotificationPagination()
+        page = paginator.paginate_queryset(notifications, request, view=self)
+        serializer = NotificationSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class NotificationUnreadCountView(APIView):
@@ -62,8 +67,7 @@ class NotificationUnreadCountView(APIView):
         security=[{'Bearer': []}]
     )
     def get(self, request):
-        count = Notification.objects.filter(user=request.user, is_read=False).count()
-        return Response({"unread_count": count})
+        return Response({"unread_count": counters.unread_count(request.user.id)})
 
 
 class MarkAllAsRead(APIView):
@@ -95,7 +99,10 @@ class MarkAllAsRead(APIView):
         security=[{'Bearer': []}]
     )
     def patch(self, request):
-        Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        updated = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        counters.reset(request.user.id)
+        if updated:
+            push_unread_count(request.user.id, 0)
         return Response({"status": "all marked as read"})
 
 
@@ -129,4 +136,6 @@ class DeleteNotification(DestroyAPIView):
     def delete(self, request, pk):
         notif = get_object_or_404(Notification, pk=pk, user=request.user)
         notif.delete()
+        if not notif.is_read:
+            push_unread_count(request.user.id, counters.decrement(request.user.id))
         return Response({"status": "deleted"}, status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_supervised_team_count(apps, schema_editor):
+    SupervisorProfile = apps.get_model('profiles', 'SupervisorProfile')
+    Team = apps.get_model('teams', 'Team')
+    teams = Team.objects.filter(supervisor=OuterRef('pk')).values('supervisor').annotate(c=Count('id')).values('c')
+    SupervisorProfile.objects.update(supervised_team_count=Coalesce(Subquery(teams), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_alter_studentprofile_specialization'),
+        ('teams', '0007_team_like_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supervisorprofile',
+            name='supervised_team_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_supervised_team_count, migrations.RunPython.noop),
+    ]
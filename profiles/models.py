@@ -73,6 +73,8 @@ class SupervisorProfile(models.Model):
     degree = models.CharField(max_length=255, blank=True, null=True)
     photo = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
     skills = models.ManyToManyField(Skill, blank=True)
+    # Number of teams with this supervisor, maintained by teams/signals.py
+    supervised_team_count = models.PositiveIntegerField(default=0)
 
     def clean(self):
         if self.pk and self.skills.count() > 10:
@@ -87,6 +89,13 @@ class SupervisorProfile(models.Model):
     def save(self, *args, **kwargs):
         if not self.pk and SupervisorProfile.objects.filter(user=self.user).exists():
             raise ValidationError("A profile for this user already exists.")
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # supervised_team_count is moved with F() updates (teams/signals.py); writing back
+            # the value this instance loaded earlier would undo concurrent changes
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "supervised_team_count"
+            ]
         super().save(*args, **kwargs)
         self.update_profile_completion()
 
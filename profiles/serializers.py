@@ -41,12 +41,12 @@ class SupervisorProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = SupervisorProfile
         fields = '__all__'
+        read_only_fields = ['supervised_team_count']
 
     def get_projects(self, obj):
-        from teams.models import Team
         from teams.serializers import TeamSerializer  # 👈 Lazy import to avoid circular
-        teams = Team.objects.filter(supervisor=obj)
-        return TeamSerializer(teams, many=True).data
+        # Uses the team_set prefetch from supervisor_queryset() when present
+        return TeamSerializer(obj.team_set.all(), many=True).data
 
     def validate_skill_ids(self, value):
         if len(value) > 10:
@@ -63,6 +63,18 @@ class SupervisorProfileSerializer(serializers.ModelSerializer):
         instance.update_profile_completion()
         return instance
 
+def supervisor_queryset():
+    """ SupervisorProfile queryset that SupervisorProfileSerializer renders in a fixed number of queries """
+    from django.db.models import Prefetch
+    from teams.models import Team
+    from teams.utils.queries import with_team_relations
+
+    return SupervisorProfile.objects.select_related("user").prefetch_related(
+        "skills",
+        Prefetch("team_set", queryset=with_team_relations(Team.objects.all())),
+    )
+
+
 class SupervisorShortSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source='user.id', read_only=True)
     """ Лёгкий сериализатор супервизора без проектов """
@@ -1,3 +1,22 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from DTest.testing import PaginationMixin
+from users.models import CustomUser
+from .models import SupervisorProfile
+
+
+class SupervisorPaginationTests(PaginationMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(email="student@example.com", role="Student"))
+        for i in range(5):
+            CustomUser.objects.create_user(email=f"supervisor{i}@example.com", role="Supervisor")
+
+    def test_cursor_round_trip(self):
+        pages = self.walk(self.client, "/api/profiles/supervisors/", page_size=2, key="user")
+        self.assertEqual([user_id for page in pages for user_id in page],
+                         list(SupervisorProfile.objects.order_by("user_id").values_list("user_id", flat=True)))
+
+    def test_page_size_is_clamped(self):
+        self.assertPageSizeClamped(self.client, "/api/profiles/supervisors/")
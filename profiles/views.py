@@ -7,6 +7,7 @@ from rest_framework.views import APIView
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
+from DTest.pagination import SupervisorPagination
 from teams.models import Team
 from teams.serializers import TeamSerializer
 from .models import StudentProfile, SupervisorProfile, DeanOfficeProfile, Skill
@@ -14,7 +15,8 @@ from .serializers import (
     StudentProfileSerializer,
     SupervisorProfileSerializer,
     DeanOfficeProfileSerializer,
-    SkillSerializer
+    SkillSerializer,
+    supervisor_queryset,
 )
 
 User = get_user_model()
@@ -178,7 +180,8 @@ class StudentProfileDetailView(generics.RetrieveAPIView):
         data = serializer.data
 
         # ✅ Импортируем TeamSerializer внутри метода, чтобы избежать цикличности
-        team = profile.teams.first()
+        from teams.utils.queries import with_team_relations
+        team = with_team_relations(profile.teams.all(), user=request.user).first()
         if team:
             from teams.serializers import TeamSerializer
             team_serializer = TeamSerializer(team, context={"request": request})
@@ -194,9 +197,12 @@ class SupervisorListView(generics.ListAPIView):
     
     Returns a list of all supervisors in the system.
     """
-    queryset = SupervisorProfile.objects.all()
     serializer_class = SupervisorProfileSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SupervisorPagination
+
+    def get_queryset(self):
+        return supervisor_queryset()
 
     @swagger_auto_schema(
         operation_summary="List all supervisors",
@@ -217,10 +223,12 @@ class SupervisorProfileDetailView(generics.RetrieveAPIView):
     
     Publicly accessible endpoint to view a supervisor's profile information.
     """
-    queryset = SupervisorProfile.objects.all()
     serializer_class = SupervisorProfileSerializer
     permission_classes = [permissions.AllowAny]  # Публичный доступ
 
+    def get_queryset(self):
+        return supervisor_queryset()
+
     @swagger_auto_schema(
         operation_summary="Get supervisor profile",
         operation_description="Retrieves detailed information about a supervisor's profile",
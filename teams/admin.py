@@ -4,7 +4,8 @@ from .models import Team, JoinRequest, SupervisorRequest, Membership
 
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
-    list_display = ('id', 'thesis_topic', 'owner', 'supervisor', 'status')
+    list_display = ('id', 'thesis_topic', 'owner', 'supervisor', 'status', 'member_count')
+    readonly_fields = ('member_count',)
     search_fields = ('thesis_topic__title', 'owner__email', 'supervisor__user__email')
     list_filter = ('status',)
 
@@ -32,3 +33,14 @@ class MembershipAdmin(admin.ModelAdmin):
     list_filter = ('team',)
     search_fields = ('student__user__email', 'team__thesis_topic__title')
     ordering = ('-joined_at',)
+
+    # Team.member_count is kept by Team.add_member()/remove_member(); rows edited
+    # here would bypass it, so memberships are changed through the API only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,97 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from teams.models import Team, JoinRequest, Membership, MAX_TEAM_MEMBERS
+from teams.views import AcceptJoinRequestView
+from topics.models import ThesisTopic
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammers AcceptJoinRequestView for one team from many threads and checks "
+        "that the team never goes over MAX_TEAM_MEMBERS. Run it against PostgreSQL: "
+        "SQLite serializes writers, so it can't show the race."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=64, help="Pending join requests to accept")
+        parser.add_argument("--keep", action="store_true", help="Don't delete the generated users and team")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            self.stderr.write("SQLite serializes writes; the numbers below say nothing about row locking.")
+
+        tag = uuid.uuid4().hex[:8]
+        owner, team, students = self._setup(tag, options["requests"])
+        view = AcceptJoinRequestView.as_view()
+        factory = APIRequestFactory()
+
+        def accept(student_id):
+            request = factory.post(f"/api/teams/{team.pk}/join-requests/{student_id}/accept/")
+            force_authenticate(request, user=owner)
+            started = time.perf_counter()
+            try:
+                response = view(request, pk=team.pk, student_id=student_id)
+                return response.status_code, time.perf_counter() - started
+            except DatabaseError as exc:
+                return type(exc).__name__, time.perf_counter() - started
+            finally:
+                connections.close_all()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+                results = list(pool.map(accept, students))
+            elapsed = time.perf_counter() - started
+
+            team.refresh_from_db()
+            members = Membership.objects.filter(team=team).count()
+            pending = JoinRequest.objects.filter(team=team, status="pending").count()
+            latencies = sorted(latency for _, latency in results)
+            codes = {}
+            for code, _ in results:
+                codes[code] = codes.get(code, 0) + 1
+
+            self.stdout.write(f"accepts:      {len(results)} in {elapsed:.2f}s ({len(results) / elapsed:.1f}/s)")
+            self.stdout.write(f"status codes: {codes}")
+            self.stdout.write(
+                f"latency ms:   p50={statistics.median(latencies) * 1000:.1f} "
+                f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} max={latencies[-1] * 1000:.1f}"
+            )
+            self.stdout.write(f"members:      {members} (member_count={team.member_count}, limit={MAX_TEAM_MEMBERS})")
+            self.stdout.write(f"pending left: {pending}")
+
+            if members > MAX_TEAM_MEMBERS or members != team.member_count:
+                raise CommandError("Team capacity was overshot or member_count drifted.")
+            self.stdout.write(self.style.SUCCESS("Capacity held."))
+        finally:
+            if not options["keep"]:
+                self._cleanup(owner, team, students)
+
+    def _setup(self, tag, count):
+        owner = CustomUser.objects.create_user(email=f"bench-owner-{tag}@example.com", role="Student")
+        topic = ThesisTopic.objects.create(title=f"Bench {tag}", description="bench_join_accept",
+                                           created_by_student=owner.student_profile)
+        team = Team.objects.create(thesis_topic=topic, owner=owner)
+        team.add_member(owner.student_profile)
+
+        students = []
+        for i in range(count):
+            user = CustomUser.objects.create_user(email=f"bench-{tag}-{i}@example.com", role="Student")
+            students.append(user.pk)
+        JoinRequest.objects.bulk_create(JoinRequest(team=team, student_id=student_id) for student_id in students)
+        return owner, team, students
+
+    def _cleanup(self, owner, team, students):
+        topic_id = team.thesis_topic_id
+        CustomUser.objects.filter(pk__in=students).delete()
+        owner.delete()
+        ThesisTopic.objects.filter(pk=topic_id).delete()
@@ -0,0 +1,273 @@
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from chat import membership
+from chat.models import Chat, ChatReadCursor, Message
+from notifications import counters
+from notifications.models import Notification
+from profiles.models import DeanOfficeProfile, Skill, StudentProfile, SupervisorProfile
+from teams.models import JoinRequest, Like, Membership, Team, MAX_TEAM_MEMBERS, SUPERVISOR_TEAM_LIMIT
+from teams.utils.skill_index import invalidate_skill_index
+from topics.models import ThesisTopic
+from users.models import CustomUser
+
+FIRST_NAMES = ["Aigerim", "Alibek", "Dana", "Yerlan", "Madina", "Nurlan", "Saule", "Timur", "Zarina", "Arman"]
+LAST_NAMES = ["Abenov", "Bekova", "Dzhaksybekov", "Ermekova", "Iskakov", "Kassymova", "Nurpeisov", "Omarova"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the database with synthetic users, profiles, skills, topics, teams, join requests, "
+        "likes, chats, messages and notifications for load testing. Everything is written with "
+        "bulk_create, so post_save/m2m_changed signals do not fire; the counters they maintain "
+        "(member_count, like_count, supervised_team_count, read cursors, direct_key) are filled in "
+        "directly and the skill index is invalidated at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=1000)
+        parser.add_argument("--supervisors", type=int, default=50)
+        parser.add_argument("--deans", type=int, default=5)
+        parser.add_argument("--skills", type=int, default=40)
+        parser.add_argument("--teams", type=int, default=200, help="Each team gets its own student-created topic")
+        parser.add_argument("--join-requests", type=int, default=5, help="Per team")
+        parser.add_argument("--likes", type=int, default=10, help="Per team, at most")
+        parser.add_argument("--chats", type=int, default=500)
+        parser.add_argument("--messages", type=int, default=50, help="Per chat")
+        parser.add_argument("--notifications", type=int, default=20, help="Per user")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--prefix", default="seed", help="Prefix for generated emails and skill names")
+        parser.add_argument("--password", default="password123", help="Password of every generated user")
+        parser.add_argument("--seed", type=int, default=None, help="Random seed, for reproducible data")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.batch_size = options["batch_size"]
+        self.rng = random.Random(options["seed"])
+        self.prefix = options["prefix"]
+        self.now = timezone.now()
+
+        if options["teams"] > options["students"]:
+            raise CommandError("--teams can't exceed --students: every team is owned by a student.")
+        if options["teams"] and options["skills"] < 1:
+            raise CommandError("Topics need at least one skill.")
+        if CustomUser.objects.filter(email__startswith=f"{self.prefix}.").exists():
+            raise CommandError(f"Users with the '{self.prefix}.' prefix already exist; pass another --prefix.")
+
+        started = time.perf_counter()
+        # One transaction for the whole run: a failure in any stage, or in the
+        # cache calls at the end, leaves no half-seeded prefix behind
+        with transaction.atomic():
+            skills = self.stage("skills", self.create_skills)
+            students, supervisors, deans = self.stage("users and profiles", self.create_users, skills)
+            teams = self.stage("topics, teams and memberships", self.create_teams, students, supervisors, skills)
+            self.stage("join requests", self.create_join_requests, teams)
+            self.stage("likes", self.create_likes, teams, students + supervisors + deans)
+            self.stage("chats and messages", self.create_chats, students, supervisors)
+            self.stage("notifications", self.create_notifications, students + supervisors + deans)
+
+            # Signals were bypassed: drop whatever the caches may hold for these ids
+            user_ids = students + supervisors + deans
+            invalidate_skill_index()
+            membership.invalidate(user_ids)
+            counters.invalidate(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s."))
+
+    def stage(self, name, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        self.stdout.write(f"{name}: {time.perf_counter() - started:.1f}s")
+        return result
+
+    def bulk(self, model, rows):
+        """ bulk_create in batches; returns the created objects with their primary keys """
+        return model.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def create_skills(self):
+        skills = self.bulk(Skill, [Skill(name=f"{self.prefix} skill {i}") for i in range(self.options["skills"])])
+        return [skill.pk for skill in skills]
+
+    def create_users(self, skills):
+        # Hashing is the slow part of create_user(); every generated user shares one hash
+        password = make_password(self.options["password"])
+        roles = [("Student", "student", self.options["students"]),
+                 ("Supervisor", "supervisor", self.options["supervisors"]),
+                 ("Dean Office", "dean", self.options["deans"])]
+        users = self.bulk(CustomUser, [
+            CustomUser(email=f"{self.prefix}.{slug}{i}@example.com", role=role, password=password,
+                       is_profile_completed=True)
+            for role, slug, count in roles for i in range(count)
+        ])
+        ids = [user.pk for user in users]
+        students = ids[:self.options["students"]]
+        supervisors = ids[len(students):len(students) + self.options["supervisors"]]
+        deans = ids[len(students) + len(supervisors):]
+
+        majors = [choice for choice, _ in StudentProfile.MAJOR_CHOICES]
+        self.bulk(StudentProfile, [
+            StudentProfile(user_id=user_id, first_name=first, last_name=last, specialization=self.rng.choice(majors),
+                           gpa=round(self.rng.uniform(2.0, 4.0), 2))
+            for user_id in students for first, last in [self.name()]
+        ])
+        self.bulk(SupervisorProfile, [
+            SupervisorProfile(user_id=user_id, first_name=first, last_name=last, degree="PhD")
+            for user_id in supervisors for first, last in [self.name()]
+        ])
+        self.bulk(DeanOfficeProfile, [
+            DeanOfficeProfile(user_id=user_id, first_name=first, last_name=last, job_role="manager")
+            for user_id in deans for first, last in [self.name()]
+        ])
+
+        if skills:
+            self.bulk(StudentProfile.skills.through, [
+                StudentProfile.skills.through(studentprofile_id=user_id, skill_id=skill_id)
+                for user_id in students for skill_id in self.rng.sample(skills, min(len(skills), 5))
+            ])
+            self.bulk(SupervisorProfile.skills.through, [
+                SupervisorProfile.skills.through(supervisorprofile_id=user_id, skill_id=skill_id)
+                for user_id in supervisors for skill_id in self.rng.sample(skills, min(len(skills), 10))
+            ])
+        return students, supervisors, deans
+
+    def create_teams(self, students, supervisors, skills):
+        """
+        The first --teams students own a team each; the students after them are
+        spread over the teams as members. Students past that stay free to send
+        join requests. Returns [(team id, member student ids)].
+        """
+        count = self.options["teams"]
+        owners = students[:count]
+        pool = iter(students[count:])
+
+        topics = self.bulk(ThesisTopic, [
+            ThesisTopic(title=f"Topic {i} by {self.prefix}", description="Generated by seed_scale.",
+                        created_by_student_id=owner)
+            for i, owner in enumerate(owners)
+        ])
+        self.bulk(ThesisTopic.required_skills.through, [
+            ThesisTopic.required_skills.through(thesistopic_id=topic.pk, skill_id=skill_id)
+            for topic in topics for skill_id in self.rng.sample(skills, min(len(skills), 3))
+        ])
+
+        # Decide everything up front, so counters go in with the INSERT instead of an UPDATE per team
+        supervised = Counter()
+        plans = []
+        for owner in owners:
+            members = [owner] + list(islice(pool, self.rng.randint(0, MAX_TEAM_MEMBERS - 1)))
+            supervisor = self.rng.choice(supervisors) if supervisors and self.rng.random() < 0.6 else None
+            if supervisor is not None and supervised[supervisor] >= SUPERVISOR_TEAM_LIMIT:
+                supervisor = None
+            if supervisor is not None:
+                supervised[supervisor] += 1
+            plans.append((owner, members, supervisor))
+
+        teams = self.bulk(Team, [
+            Team(thesis_topic_id=topic.pk, owner_id=owner, supervisor_id=supervisor, member_count=len(members),
+                 status=self.rng.choice(["pending", "approved", "approved", "rejected"]))
+            for topic, (owner, members, supervisor) in zip(topics, plans)
+        ])
+        self.bulk(Membership, [
+            Membership(team_id=team.pk, student_id=student)
+            for team, (_, members, _) in zip(teams, plans) for student in members
+        ])
+
+        profiles = SupervisorProfile.objects.filter(pk__in=supervised).only("pk")
+        for profile in profiles:
+            profile.supervised_team_count = supervised[profile.pk]
+        SupervisorProfile.objects.bulk_update(profiles, ["supervised_team_count"], batch_size=self.batch_size)
+
+        self.free_students = list(pool)
+        return [(team.pk, members) for team, (_, members, _) in zip(teams, plans)]
+
+    def create_join_requests(self, teams):
+        """ A free student has at most one pending request, like JoinTeamView allows """
+        if not self.free_students:
+            return
+        has_pending = set()
+        rows = []
+        for team_id, _ in teams:
+            for student in self.rng.sample(self.free_students, min(len(self.free_students), self.options["join_requests"])):
+                status = "rejected" if student in has_pending else "pending"
+                has_pending.add(student)
+                rows.append(JoinRequest(team_id=team_id, student_id=student, status=status))
+        self.bulk(JoinRequest, rows)
+
+    def create_likes(self, teams, users):
+        rows = []
+        like_counts = {}
+        for team_id, _ in teams:
+            likers = self.rng.sample(users, min(len(users), self.rng.randint(0, self.options["likes"])))
+            rows += [Like(team_id=team_id, user_id=user_id) for user_id in likers]
+            like_counts[team_id] = len(likers)
+        self.bulk(Like, rows)
+
+        liked = [Team(pk=team_id, like_count=n) for team_id, n in like_counts.items() if n]
+        Team.objects.bulk_update(liked, ["like_count"], batch_size=self.batch_size)
+
+    def create_chats(self, students, supervisors):
+        """
+        One-to-one chats between random users (direct_key keeps pairs unique),
+        each with --messages messages. All but the last few are read by both
+        sides, and the read cursors say the same.
+        """
+        users = students + supervisors
+        if len(users) < 2:
+            return
+        pairs = set()
+        attempts = 0
+        while len(pairs) < self.options["chats"] and attempts < self.options["chats"] * 10:
+            attempts += 1
+            a, b = self.rng.sample(users, 2)
+            pairs.add(Chat.direct_key_for(a, b))
+        pairs = [tuple(int(user_id) for user_id in key.split(":")) for key in pairs]
+
+        chats = self.bulk(Chat, [Chat(direct_key=Chat.direct_key_for(a, b)) for a, b in pairs])
+        self.bulk(Chat.participants.through, [
+            Chat.participants.through(chat_id=chat.pk, customuser_id=user_id)
+            for chat, pair in zip(chats, pairs) for user_id in pair
+        ])
+
+        # Messages go in chunks of chats, so a million rows never sit in memory at once
+        per_chat = self.options["messages"]
+        chunk = max(1, self.batch_size // max(per_chat, 1))
+        for start in range(0, len(chats), chunk):
+            messages = []
+            unread = []
+            for chat, pair in zip(chats[start:start + chunk], pairs[start:start + chunk]):
+                unread_tail = self.rng.randint(0, min(per_chat, 5))
+                unread.append(unread_tail)
+                sent_at = self.now - timedelta(days=30)
+                for i in range(per_chat):
+                    sent_at += timedelta(minutes=self.rng.randint(1, 120))
+                    messages.append(Message(chat_id=chat.pk, sender_id=pair[i % 2], content=f"Message {i}",
+                                            timestamp=sent_at, is_read=i < per_chat - unread_tail))
+            created = self.bulk(Message, messages)
+
+            cursors = []
+            for n, (chat, pair) in enumerate(zip(chats[start:start + chunk], pairs[start:start + chunk])):
+                read = per_chat - unread[n]
+                if read:
+                    last_read_id = created[n * per_chat + read - 1].pk
+                    cursors += [ChatReadCursor(chat_id=chat.pk, user_id=user_id, last_read_message_id=last_read_id)
+                                for user_id in pair]
+            self.bulk(ChatReadCursor, cursors)
+
+    def create_notifications(self, users):
+        per_user = self.options["notifications"]
+        chunk = max(1, self.batch_size // max(per_user, 1))
+        for start in range(0, len(users), chunk):
+            self.bulk(Notification, [
+                Notification(user_id=user_id, message=f"Notification {i}", is_read=i < per_user - 3)
+                for user_id in users[start:start + chunk] for i in range(per_user)
+            ])
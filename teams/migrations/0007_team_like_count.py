@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:14
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_like_count(apps, schema_editor):
+    Team = apps.get_model('teams', 'Team')
+    Like = apps.get_model('teams', 'Like')
+    likes = Like.objects.filter(team=OuterRef('pk')).values('team').annotate(c=Count('id')).values('c')
+    Team.objects.update(like_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_alter_studentprofile_specialization'),
+        ('teams', '0006_membership_team_members'),
+        ('topics', '0002_thesistopic_title_kz_thesistopic_title_ru'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_like_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['-like_count', 'id'], name='team_like_rank_idx'),
+        ),
+    ]
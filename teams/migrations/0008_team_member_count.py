@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:18
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_member_count(apps, schema_editor):
+    Team = apps.get_model('teams', 'Team')
+    Membership = apps.get_model('teams', 'Membership')
+    members = Membership.objects.filter(team=OuterRef('pk')).values('team').annotate(c=Count('id')).values('c')
+    Team.objects.update(member_count=Coalesce(Subquery(members), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0007_team_like_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_member_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0005_supervisorprofile_supervised_team_count'),
+        ('teams', '0008_team_member_count'),
+        ('topics', '0002_thesistopic_title_kz_thesistopic_title_ru'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='joinrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['student'], name='joinreq_student_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='joinrequest',
+            index=models.Index(fields=['team', 'status', '-created_at'], name='joinreq_team_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supervisorrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['supervisor'], name='supervisorreq_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['id'], name='team_approved_idx'),
+        ),
+    ]
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.conf import settings
 from profiles.models import StudentProfile, SupervisorProfile, Skill
 from topics.models import ThesisTopic
 
+MAX_TEAM_MEMBERS = 4
+SUPERVISOR_TEAM_LIMIT = 10
+
 class Membership(models.Model):
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
     team = models.ForeignKey('Team', on_delete=models.CASCADE)
@@ -27,6 +31,74 @@ class Team(models.Model):
         choices=[("pending", "Pending Approval"), ("approved", "Approved"), ("rejected", "Rejected")],
         default="pending"
     )
+    like_count = models.PositiveIntegerField(default=0)
+    # Maintained by add_member()/add_members()/remove_member(); never change memberships behind their back
+    member_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-like_count', 'id'], name='team_like_rank_idx'),
+            # Public team list and the Excel export read approved teams only
+            models.Index(fields=['id'], condition=Q(status='approved'), name='team_approved_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the supervisor as loaded, so post_save knows whose counter to move
+        if 'supervisor_id' in instance.__dict__:
+            instance._loaded_supervisor_id = instance.supervisor_id
+        return instance
+
+    def add_member(self, student):
+        """
+        Adds `student` (profile or its pk) if the team has a free place.
+
+        The capacity check and the increment are one conditional UPDATE, so
+        parallel accepts for the same team can't overshoot MAX_TEAM_MEMBERS.
+        Returns False when the team is already full.
+        """
+        student_id = getattr(student, "pk", student)
+        with transaction.atomic():
+            updated = Team.objects.filter(pk=self.pk, member_count__lt=MAX_TEAM_MEMBERS) \
+                .update(member_count=F("member_count") + 1)
+            if not updated:
+                return False
+            Membership.objects.create(team=self, student_id=student_id)
+        self.refresh_from_db(fields=["member_count"])
+        return True
+
+    def add_members(self, student_ids):
+        """
+        Adds all of `student_ids` or none of them: one guarded UPDATE reserves
+        the places, one bulk INSERT creates the memberships.
+        Returns False when the team doesn't have that many free places.
+        """
+        student_ids = list(student_ids)
+        if not student_ids:
+            return True
+        with transaction.atomic():
+            updated = Team.objects.filter(pk=self.pk, member_count__lte=MAX_TEAM_MEMBERS - len(student_ids)) \
+                .update(member_count=F("member_count") + len(student_ids))
+            if not updated:
+                return False
+            Membership.objects.bulk_create(Membership(team=self, student_id=student_id) for student_id in student_ids)
+        self.refresh_from_db(fields=["member_count"])
+        return True
+
+    def remove_member(self, student):
+        """ Removes `student` (profile or its pk); returns False if they were not a member """
+        student_id = getattr(student, "pk", student)
+        with transaction.atomic():
+            deleted, _ = Membership.objects.filter(team=self, student_id=student_id).delete()
+            if deleted:
+                Team.objects.filter(pk=self.pk, member_count__gt=0).update(member_count=F("member_count") - 1)
+        self.refresh_from_db(fields=["member_count"])
+        return bool(deleted)
+
+    @property
+    def is_full(self):
+        return self.member_count >= MAX_TEAM_MEMBERS
 
     def has_required_skills(self):
         """ Checks if the team collectively meets at least 4 required skills """
@@ -41,13 +113,15 @@ class Team(models.Model):
         self.save()
 
     def approve_team(self, supervisor):
-        from teams.models import Team
-        if Team.objects.filter(supervisor=supervisor).count() >= 10:
-            raise ValueError("Supervisor cannot own more than 10 teams.")
-        self.supervisor = supervisor
-        self.owner = supervisor.user
-        self.status = "approved"
-        self.save()
+        with transaction.atomic():
+            # Блокируем профиль, чтобы параллельные approve не превысили лимит
+            locked = SupervisorProfile.objects.select_for_update().get(pk=supervisor.pk)
+            if self.supervisor_id != locked.pk and locked.supervised_team_count >= SUPERVISOR_TEAM_LIMIT:
+                raise ValueError("Supervisor cannot own more than 10 teams.")
+            self.supervisor = supervisor
+            self.owner = supervisor.user
+            self.status = "approved"
+            self.save()
 
     def reject_team(self):
         self.status = "rejected"
@@ -69,6 +143,12 @@ class JoinRequest(models.Model):
 
     class Meta:
         unique_together = ('student', 'team')
+        indexes = [
+            # "Does this student already have a pending request?" on every join attempt
+            models.Index(fields=['student'], condition=Q(status='pending'), name='joinreq_student_pending_idx'),
+            # Owner's incoming list (newest first) and the pending requests of a team
+            models.Index(fields=['team', 'status', '-created_at'], name='joinreq_team_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.user.email} requests to join {self.team}"
@@ -87,6 +167,10 @@ class SupervisorRequest(models.Model):
 
     class Meta:
         unique_together = ('team', 'supervisor')
+        indexes = [
+            # Supervisor's incoming requests
+            models.Index(fields=['supervisor'], condition=Q(status='pending'), name='supervisorreq_pending_idx'),
+        ]
 
     def __str__(self):
         return f"{self.team.thesis_topic.title} → {self.supervisor.user.email} [{self.status}]"
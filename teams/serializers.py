@@ -15,14 +15,22 @@ class TeamSerializer(serializers.ModelSerializer):
     thesis_description = serializers.CharField(source='thesis_topic.description', read_only=True)
     required_skills = serializers.SerializerMethodField(read_only=True)
     thesis_id = serializers.IntegerField(source='thesis_topic.id', read_only=True)
+    liked_by_me = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Team
-        fields = ['id','thesis_id', 'thesis_topic', 'thesis_name', 'thesis_description', 'owner', 'members', 'status', 'supervisor', 'required_skills']
+        fields = ['id','thesis_id', 'thesis_topic', 'thesis_name', 'thesis_description', 'owner', 'members', 'status', 'supervisor', 'required_skills',
+                  'like_count', 'liked_by_me', 'member_count']
+        read_only_fields = ['like_count', 'member_count']
 
     def get_required_skills(self, obj):
         return [skill.name for skill in obj.thesis_topic.required_skills.all()]
 
+    def get_liked_by_me(self, obj):
+        # Filled in by teams.utils.queries.annotate_liked_by; None when the queryset
+        # wasn't annotated for a user, so "unknown" isn't reported as "not liked"
+        return getattr(obj, 'liked_by_me', None)
+
     def validate(self, data):
         user = self.context['request'].user
         if hasattr(user, 'student_profile'):
@@ -43,6 +51,15 @@ class JoinRequestSerializer(serializers.ModelSerializer):
         members = obj.team.members.all()
         return StudentProfileSerializer(members, many=True).data
 
+class JoinRequestCompactSerializer(serializers.ModelSerializer):
+    """ Join request that points at its team by id; the team itself is side-loaded once per response """
+    student = StudentProfileSerializer(read_only=True)
+
+    class Meta:
+        model = JoinRequest
+        fields = ['id', 'team', 'student', 'status', 'created_at']
+        read_only_fields = fields
+
 class SupervisorRequestSerializer(serializers.ModelSerializer):
     supervisor = SupervisorProfileSerializer(read_only=True)
     team = TeamSerializer(read_only=True)
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from profiles.models import Skill, StudentProfile, SupervisorProfile
+from topics.models import ThesisTopic
+from .models import Team
+from .utils.skill_index import skill_mask, update_entry, invalidate_skill_index
+
+
+def _refresh_skill_index(kind, instance, action, reverse):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # skill.<owner>_set.add(...) touches many owners at once — just rebuild
+        transaction.on_commit(invalidate_skill_index)
+        return
+    related = instance.required_skills if kind == "topics" else instance.skills
+    mask = skill_mask(related.values_list("id", flat=True))
+    transaction.on_commit(lambda: update_entry(kind, instance.pk, mask))
+
+
+@receiver(m2m_changed, sender=StudentProfile.skills.through)
+def student_skills_changed(sender, instance, action, reverse, **kwargs):
+    """ Keeps the student's bitset in the skill index current """
+    _refresh_skill_index("students", instance, action, reverse)
+
+
+@receiver(m2m_changed, sender=ThesisTopic.required_skills.through)
+def topic_skills_changed(sender, instance, action, reverse, **kwargs):
+    """ Keeps the topic's bitset in the skill index current """
+    _refresh_skill_index("topics", instance, action, reverse)
+
+
+@receiver(m2m_changed, sender=SupervisorProfile.skills.through)
+def supervisor_skills_changed(sender, instance, action, reverse, **kwargs):
+    """ Keeps the supervisor's bitset in the skill index current """
+    _refresh_skill_index("supervisors", instance, action, reverse)
+
+
+@receiver(post_delete, sender=Skill)
+def skill_deleted(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_skill_index)
+
+
+def _move_supervised_count(supervisor_id, delta):
+    if supervisor_id is None:
+        return
+    qs = SupervisorProfile.objects.filter(pk=supervisor_id)
+    if delta < 0:
+        qs = qs.filter(supervised_team_count__gt=0)
+    qs.update(supervised_team_count=F("supervised_team_count") + delta)
+
+
+@receiver(post_save, sender=Team)
+def team_supervisor_changed(sender, instance, created, **kwargs):
+    """
+    Keeps SupervisorProfile.supervised_team_count in step with Team.supervisor.
+
+    Covers Team.save(); bulk `.update(supervisor=...)` bypasses signals and
+    must adjust the counters itself.
+    """
+    if created:
+        previous = None
+    elif hasattr(instance, "_loaded_supervisor_id"):
+        previous = instance._loaded_supervisor_id
+    else:
+        # Loaded with supervisor deferred — recount the current supervisor instead
+        if instance.supervisor_id is not None:
+            SupervisorProfile.objects.filter(pk=instance.supervisor_id).update(
+                supervised_team_count=Team.objects.filter(supervisor_id=instance.supervisor_id).count()
+            )
+        instance._loaded_supervisor_id = instance.supervisor_id
+        return
+
+    if previous != instance.supervisor_id:
+        _move_supervised_count(previous, -1)
+        _move_supervised_count(instance.supervisor_id, +1)
+    instance._loaded_supervisor_id = instance.supervisor_id
+
+
+@receiver(post_delete, sender=Team)
+def team_deleted(sender, instance, **kwargs):
+    _move_supervised_count(instance.supervisor_id, -1)
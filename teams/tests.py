@@ -1,3 +1,753 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import uuid
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from chat.models import Chat
+from DTest.testing import PaginationMixin, QueryPlanMixin
+from profiles.models import Skill, StudentProfile, SupervisorProfile
+from topics.models import ThesisTopic
+from users.models import CustomUser
+from .models import Team, Membership, Like, JoinRequest, SupervisorRequest, MAX_TEAM_MEMBERS, SUPERVISOR_TEAM_LIMIT
+from .serializers import TeamSerializer
+from .utils import export_jobs, recommendations, skill_index
+from .utils.queries import with_team_relations
+
+
+class QueryBudgetMixin:
+    """ Helpers that fail when an endpoint's query count grows with its rows """
+
+    def count_queries(self, url, client):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return ctx
+
+    def assertConstantQueries(self, url, grow, client=None):
+        """ Requests `url`, calls `grow()` to add rows, requests again and compares query counts """
+        client = client or self.client
+        before = self.count_queries(url, client)
+        grow()
+        after = self.count_queries(url, client)
+        self.assertEqual(
+            len(before), len(after),
+            "Query count grows with the number of rows:\n" + "\n".join(q["sql"] for q in after.captured_queries)
+        )
+
+
+class TeamListQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.skills = [Skill.objects.create(name=f"Skill {i}") for i in range(3)]
+        self.supervisor = CustomUser.objects.create_user(email="super.visor@example.com", role="Supervisor")
+        self.dean = CustomUser.objects.create_user(email="dean-office@example.com", role="Dean Office")
+        self.teams_created = 0
+        self.add_teams(2)
+
+    def add_teams(self, count, members=3):
+        for _ in range(count):
+            index = self.teams_created
+            self.teams_created += 1
+
+            owner = CustomUser.objects.create_user(email=f"owner_{index}@example.com", role="Student")
+            topic = ThesisTopic.objects.create(title=f"Topic {index}", description="...",
+                                               created_by_student=owner.student_profile)
+            topic.required_skills.set(self.skills)
+            team = Team.objects.create(thesis_topic=topic, owner=owner, status="approved",
+                                       supervisor=self.supervisor.supervisor_profile)
+            Membership.objects.create(team=team, student=owner.student_profile)
+
+            for m in range(members - 1):
+                student = CustomUser.objects.create_user(email=f"member_{index}_{m}@example.com", role="Student")
+                student.student_profile.skills.set(self.skills[:2])
+                Membership.objects.create(team=team, student=student.student_profile)
+
+            Like.objects.create(user=self.dean, team=team)
+
+    def test_team_list(self):
+        self.assertConstantQueries("/api/teams/", lambda: self.add_teams(3))
+
+    def test_approved_teams_for_dean(self):
+        self.client.force_authenticate(self.dean)
+        self.assertConstantQueries("/api/teams/approved/", lambda: self.add_teams(3))
+
+    def test_liked_projects(self):
+        self.client.force_authenticate(self.dean)
+        self.assertConstantQueries("/api/teams/likes/", lambda: self.add_teams(3))
+
+    def test_supervisor_list(self):
+        self.client.force_authenticate(self.dean)
+        self.assertConstantQueries("/api/profiles/supervisors/", lambda: self.add_teams(3))
+
+    def test_supervisor_team_count_follows_team_supervisor(self):
+        profile = self.supervisor.supervisor_profile
+        profile.refresh_from_db()
+        self.assertEqual(profile.supervised_team_count, 2)
+
+        team = Team.objects.filter(supervisor=profile).first()
+        team.supervisor = None
+        team.save()
+        Team.objects.filter(supervisor=profile).first().delete()
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.supervised_team_count, 0)
+
+    def test_supervisor_projects(self):
+        self.client.force_authenticate(self.supervisor)
+        self.assertConstantQueries("/api/teams/my-projects/", lambda: self.add_teams(3))
+
+
+class JoinAcceptCapacityTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", role="Student")
+        topic = ThesisTopic.objects.create(title="Topic", description="...", created_by_student=self.owner.student_profile)
+        self.team = Team.objects.create(thesis_topic=topic, owner=self.owner)
+        self.team.add_member(self.owner.student_profile)
+        self.students = [CustomUser.objects.create_user(email=f"s{i}@example.com", role="Student") for i in range(5)]
+        for student in self.students:
+            JoinRequest.objects.create(team=self.team, student=student.student_profile)
+        self.client.force_authenticate(self.owner)
+
+    def accept(self, student):
+        return self.client.post(f"/api/teams/{self.team.pk}/join-requests/{student.pk}/accept/")
+
+    def test_full_team_rejects_competing_requests(self):
+        for student in self.students[:3]:
+            self.assertEqual(self.accept(student).status_code, 200)
+
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.member_count, MAX_TEAM_MEMBERS)
+        self.assertEqual(Membership.objects.filter(team=self.team).count(), MAX_TEAM_MEMBERS)
+        self.assertFalse(JoinRequest.objects.filter(team=self.team, status="pending").exists())
+        self.assertEqual(self.accept(self.students[3]).status_code, 404)
+
+    def test_competing_requests_stay_visible_as_rejected(self):
+        for student in self.students[:3]:
+            self.accept(student)
+
+        response = self.client.get("/api/teams/my-team-join-requests/")
+        self.assertEqual(response.status_code, 200)
+        statuses = {row["student"]["user"]: row["status"] for row in response.data}
+        self.assertEqual(statuses, {
+            **{student.pk: "accepted" for student in self.students[:3]},
+            **{student.pk: "rejected" for student in self.students[3:]},
+        })
+
+        # A closed request is reopened once the team has room again
+        self.team.remove_member(self.students[0].student_profile)
+        self.client.force_authenticate(self.students[3])
+        self.assertEqual(self.client.post(f"/api/teams/{self.team.pk}/join/").status_code, 200)
+        self.assertEqual(JoinRequest.objects.get(team=self.team, student_id=self.students[3].pk).status, "pending")
+
+    def test_admin_cannot_edit_memberships(self):
+        membership_admin = admin.site._registry[Membership]
+        request = RequestFactory().get("/admin/")
+        request.user = CustomUser.objects.create_superuser(email="admin@example.com", password="pw")
+        self.assertFalse(membership_admin.has_add_permission(request))
+        self.assertFalse(membership_admin.has_change_permission(request))
+        self.assertFalse(membership_admin.has_delete_permission(request))
+        self.assertTrue(membership_admin.has_view_permission(request))
+
+    def test_add_member_refuses_past_capacity(self):
+        for student in self.students[:3]:
+            self.assertTrue(self.team.add_member(student.student_profile))
+        self.assertFalse(self.team.add_member(self.students[3].student_profile))
+        self.assertEqual(self.team.member_count, MAX_TEAM_MEMBERS)
+
+    def test_bulk_moderation_reports_each_request(self):
+        s = self.students
+        response = self.client.post(
+            f"/api/teams/{self.team.pk}/join-requests/bulk/",
+            {"accept": [s[0].pk, s[1].pk, s[2].pk, s[3].pk, 999], "reject": [s[4].pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        results = {(r["student_id"], r["action"]): r["result"] for r in response.data["results"]}
+        self.assertEqual(results[(s[2].pk, "accept")], "accepted")
+        self.assertEqual(results[(s[3].pk, "accept")], "team_full")
+        self.assertEqual(results[(999, "accept")], "not_found")
+        self.assertEqual(results[(s[4].pk, "reject")], "rejected")
+        self.assertEqual(response.data["auto_rejected"], [s[3].pk])
+        self.assertEqual(response.data["member_count"], MAX_TEAM_MEMBERS)
+        self.assertEqual(Membership.objects.filter(team=self.team).count(), MAX_TEAM_MEMBERS)
+        self.assertFalse(JoinRequest.objects.filter(team=self.team, status="pending").exists())
+
+
+class JoinRequestListQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", role="Student")
+        topic = ThesisTopic.objects.create(title="Topic", description="...", created_by_student=self.owner.student_profile)
+        self.team = Team.objects.create(thesis_topic=topic, owner=self.owner)
+        self.team.add_member(self.owner.student_profile)
+        self.requests_created = 0
+        self.add_requests(2)
+        self.client.force_authenticate(self.owner)
+
+    def add_requests(self, count):
+        for _ in range(count):
+            self.requests_created += 1
+            student = CustomUser.objects.create_user(email=f"s{self.requests_created}@example.com", role="Student")
+            JoinRequest.objects.create(team=self.team, student=student.student_profile)
+
+    def test_owner_join_requests(self):
+        self.assertConstantQueries("/api/teams/my-team-join-requests/", lambda: self.add_requests(3))
+
+    def test_owner_join_requests_compact(self):
+        url = "/api/teams/my-team-join-requests/?compact=1"
+        self.assertConstantQueries(url, lambda: self.add_requests(3))
+
+        data = self.client.get(url).data
+        self.assertEqual(list(data["teams"]), [str(self.team.pk)])
+        self.assertTrue(all(r["team"] == self.team.pk for r in data["requests"]))
+
+
+class TeamIndexTests(QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.supervisor = CustomUser.objects.create_user(email="super.visor@example.com", role="Supervisor")
+        students = [CustomUser.objects.create_user(email=f"s{i}@example.com", role="Student").student_profile
+                    for i in range(30)]
+        teams = []
+        for i, owner in enumerate(students[:10]):
+            topic = ThesisTopic.objects.create(title=f"Topic {i}", description="...", created_by_student=owner)
+            teams.append(Team.objects.create(thesis_topic=topic, owner=owner.user,
+                                             status="approved" if i % 5 == 0 else "pending"))
+        JoinRequest.objects.bulk_create([
+            JoinRequest(team=team, student=student, status="pending" if (i + j) % 7 == 0 else "rejected")
+            for i, team in enumerate(teams) for j, student in enumerate(students[10:])
+        ])
+        SupervisorRequest.objects.bulk_create([
+            SupervisorRequest(team=team, supervisor=self.supervisor.supervisor_profile,
+                              status="pending" if i % 3 == 0 else "rejected")
+            for i, team in enumerate(teams)
+        ])
+        self.team = teams[0]
+        self.student = students[10]
+        self.analyze()
+
+    def test_pending_join_request_lookups(self):
+        self.assertUsesIndex(JoinRequest.objects.filter(student=self.student, status="pending"),
+                             "joinreq_student_pending_idx")
+        self.assertUsesIndex(JoinRequest.objects.filter(team=self.team, status="pending"), "joinreq_team_status_idx")
+
+    def test_incoming_supervisor_requests(self):
+        pending = SupervisorRequest.objects.filter(supervisor=self.supervisor.supervisor_profile, status="pending")
+        self.assertUsesIndex(pending, "supervisorreq_pending_idx")
+
+    def test_approved_teams(self):
+        self.assertUsesIndex(Team.objects.filter(status="approved").order_by("id"), "team_approved_idx")
+
+
+class TeamPaginationTests(PaginationMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teams_created = 0
+        for _ in range(5):
+            self.add_team()
+
+    def add_team(self):
+        index = self.teams_created
+        self.teams_created += 1
+        owner = CustomUser.objects.create_user(email=f"owner{index}@example.com", role="Student")
+        topic = ThesisTopic.objects.create(title=f"Topic {index}", description="...",
+                                           created_by_student=owner.student_profile)
+        return Team.objects.create(thesis_topic=topic, owner=owner)
+
+    def test_cursor_round_trip_is_stable_while_teams_are_added(self):
+        existing = list(Team.objects.order_by("id").values_list("id", flat=True))
+        pages = self.walk(self.client, "/api/teams/", page_size=2, between_pages=self.add_team)
+
+        seen = [team_id for page in pages for team_id in page]
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(seen[:len(existing)], existing)
+        self.assertTrue(all(len(page) <= 2 for page in pages))
+
+    def test_page_size_is_clamped(self):
+        self.assertPageSizeClamped(self.client, "/api/teams/")
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class LikeRankingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.teams = []
+        for i in range(3):
+            owner = CustomUser.objects.create_user(email=f"owner{i}@example.com", role="Student")
+            topic = ThesisTopic.objects.create(title=f"Topic {i}", description="...",
+                                               created_by_student=owner.student_profile)
+            self.teams.append(Team.objects.create(thesis_topic=topic, owner=owner))
+        self.fans = [CustomUser.objects.create_user(email=f"fan{i}@example.com", role="Student") for i in range(3)]
+
+    def toggle(self, user, team):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f"/api/teams/likes/toggle/{team.id}/")
+
+    def top(self, **params):
+        response = self.client.get("/api/teams/likes/top/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [team["id"] for team in response.data]
+
+    def test_toggle_keeps_like_count_in_step(self):
+        team = self.teams[0]
+        self.assertEqual(self.toggle(self.fans[0], team).status_code, 201)
+        self.assertEqual(self.toggle(self.fans[1], team).status_code, 201)
+        self.assertEqual(self.toggle(self.fans[0], team).status_code, 200)
+        team.refresh_from_db()
+        self.assertEqual(team.like_count, 1)
+        self.assertEqual(team.like_count, Like.objects.filter(team=team).count())
+
+    def test_ranking_follows_likes_and_cache_is_dropped_on_commit(self):
+        first, second, unliked = self.teams
+        for fan in self.fans[:2]:
+            self.toggle(fan, second)
+        self.toggle(self.fans[0], first)
+        self.assertEqual(self.top(), [second.id, first.id])
+
+        # Served from the cache until a toggle commits
+        Team.objects.filter(pk=first.pk).update(like_count=10)
+        self.assertEqual(self.top(), [second.id, first.id])
+        self.toggle(self.fans[2], unliked)
+        self.assertEqual(self.top(), [first.id, second.id, unliked.id])
+
+    def test_liked_by_me_is_unknown_without_a_user(self):
+        team = self.teams[0]
+        self.toggle(self.fans[0], team)
+        liked = with_team_relations(Team.objects.filter(pk=team.pk), user=self.fans[0]).get()
+        not_liked = with_team_relations(Team.objects.filter(pk=team.pk), user=self.fans[1]).get()
+        self.assertIs(TeamSerializer(liked).data["liked_by_me"], True)
+        self.assertIs(TeamSerializer(not_liked).data["liked_by_me"], False)
+        self.assertIsNone(TeamSerializer(with_team_relations(Team.objects.filter(pk=team.pk)).get()).data["liked_by_me"])
+
+    def test_limit_is_clamped(self):
+        for i, team in enumerate(self.teams):
+            for fan in self.fans[:i + 1]:
+                self.toggle(fan, team)
+        self.assertEqual(len(self.top(limit=-5)), 1)
+        self.assertEqual(len(self.top(limit=0)), 1)
+        self.assertEqual(len(self.top(limit=2)), 2)
+        self.assertEqual(len(self.top(limit="x")), 3)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class SupervisorCapacityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.supervisor = CustomUser.objects.create_user(email="super.visor@example.com", role="Supervisor")
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", role="Student")
+        self.teams = [self.add_team(self.owner, i) for i in range(2)]
+
+    def add_team(self, owner, index):
+        topic = ThesisTopic.objects.create(title=f"Topic {owner.id}-{index}", description="...")
+        return Team.objects.create(thesis_topic=topic, owner=owner)
+
+    def profile(self):
+        return SupervisorProfile.objects.get(pk=self.supervisor.pk)
+
+    def test_stale_profile_save_keeps_counter(self):
+        stale = self.profile()
+        self.teams[0].supervisor = stale
+        self.teams[0].save()
+
+        stale.degree = "PhD"
+        stale.save()
+        self.supervisor.save()  # save_user_profile saves the cached profile too
+
+        profile = self.profile()
+        self.assertEqual((profile.degree, profile.supervised_team_count), ("PhD", 1))
+
+    def test_accept_respects_limit(self):
+        requests = [SupervisorRequest.objects.create(team=team, supervisor=self.profile()) for team in self.teams]
+        self.client.force_authenticate(self.supervisor)
+
+        response = self.client.post(f"/api/teams/supervisor-requests/{requests[0].id}/accept/")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.profile().supervised_team_count, 1)
+
+        SupervisorProfile.objects.filter(pk=self.supervisor.pk).update(supervised_team_count=SUPERVISOR_TEAM_LIMIT)
+        response = self.client.post(f"/api/teams/supervisor-requests/{requests[1].id}/accept/")
+        self.assertEqual(response.status_code, 400)
+        self.teams[1].refresh_from_db()
+        self.assertIsNone(self.teams[1].supervisor_id)
+
+    def test_matches_need_explicit_team_for_several_owned(self):
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.get("/api/teams/supervisor-matches/").status_code, 400)
+        response = self.client.get("/api/teams/supervisor-matches/", {"team": self.teams[1].id})
+        self.assertEqual(response.status_code, 200, response.content)
+
+        other = CustomUser.objects.create_user(email="other@example.com", role="Student")
+        foreign = self.add_team(other, 0)
+        response = self.client.get("/api/teams/supervisor-matches/", {"team": foreign.id})
+        self.assertEqual(response.status_code, 404)
+
+
+class ApprovedTeamsMixin:
+    """ Builds approved teams the way the Excel exports read them """
+
+    def approved_team(self, index, members=1, supervisor=None):
+        owner = CustomUser.objects.create_user(email=f"export.owner{index}@example.com", role="Student")
+        topic = ThesisTopic.objects.create(title=f"Topic {index}", title_kz=f"Такырып {index}",
+                                           title_ru=f"Тема {index}", description="...")
+        team = Team.objects.create(thesis_topic=topic, owner=owner, status="approved", supervisor=supervisor)
+        for i in range(members):
+            student = CustomUser.objects.create_user(email=f"export.student{index}.{i}@example.com", role="Student")
+            StudentProfile.objects.filter(user=student).update(first_name=f"Name{i}", last_name=f"Team{index}")
+            team.add_member(student.student_profile)
+        return team
+
+    def workbook_rows(self, content):
+        return list(openpyxl.load_workbook(io.BytesIO(content)).active.iter_rows(values_only=True))
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ExportJobTests(ApprovedTeamsMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.dean = CustomUser.objects.create_user(email="dean@example.com", role="Dean Office")
+        self.client.force_authenticate(self.dean)
+        self.approved_team(0, members=2)
+
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir, ignore_errors=True)
+        patcher = mock.patch.object(export_jobs, "EXPORT_DIR", export_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Jobs are queued but not run; the tests run them with _run_job()
+        self.executor = mock.Mock()
+        patcher = mock.patch.object(export_jobs, "get_executor", return_value=self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # No heartbeat thread; markers are refreshed by calling refresh_running_markers()
+        patcher = mock.patch.object(export_jobs, "_heartbeat", mock.Mock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(export_jobs._owned.clear)
+
+    def start(self, expected_status=202):
+        response = self.client.post("/api/teams/export-excel/jobs/")
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response.data
+
+    def status(self, job_id):
+        return self.client.get(f"/api/teams/export-excel/jobs/{job_id}/")
+
+    def download(self, job_id):
+        return self.client.get(f"/api/teams/export-excel/jobs/{job_id}/download/")
+
+    def test_job_lifecycle(self):
+        job = self.start()
+        self.assertEqual(job["status"], "pending")
+        self.executor.submit.assert_called_once_with(export_jobs._run_job, job["job_id"])
+        self.assertEqual(self.status(job["job_id"]).data["status"], "pending")
+        self.assertEqual(self.download(job["job_id"]).status_code, 409)
+
+        export_jobs._run_job(job["job_id"])
+        self.assertEqual(self.status(job["job_id"]).data, {"job_id": job["job_id"], "status": "done", "error": None})
+
+        response = self.download(job["job_id"])
+        self.assertEqual(response.status_code, 200)
+        rows = self.workbook_rows(b"".join(response.streaming_content))
+        response.close()
+        self.assertEqual(rows[0], ("№", "Студент", "Тема", "Супервайзер"))
+        self.assertEqual([row[1] for row in rows[1:]], ["Team0 Name0", "Team0 Name1"])
+
+    def test_running_job_is_shared(self):
+        first = self.start()
+        second = self.start()
+        self.assertEqual(second["job_id"], first["job_id"])
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+        # The running key is released when the job ends
+        export_jobs._run_job(first["job_id"])
+        self.assertIsNone(cache.get(export_jobs._running_key(export_jobs.approved_teams_fingerprint())))
+
+    def test_marker_of_a_lost_job_is_taken_over(self):
+        key = export_jobs._running_key(export_jobs.approved_teams_fingerprint())
+        cache.set(key, "job-of-a-killed-worker", timeout=export_jobs.RUNNING_TTL)
+
+        job = self.start()
+        self.assertEqual(job["status"], "pending")
+        self.assertEqual(cache.get(key), job["job_id"])
+        self.assertEqual(self.start()["job_id"], job["job_id"])
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+    def test_marker_is_refreshed_only_while_its_job_is_open(self):
+        fingerprint = export_jobs.approved_teams_fingerprint()
+        job = self.start()
+        self.assertEqual(export_jobs._owned, {fingerprint})
+        export_jobs.refresh_running_markers()
+        self.assertEqual(cache.get(export_jobs._running_key(fingerprint)), job["job_id"])
+
+        export_jobs._run_job(job["job_id"])
+        self.assertEqual(export_jobs._owned, set())
+
+    def test_built_file_is_reused_until_data_changes(self):
+        first = self.start()
+        export_jobs._run_job(first["job_id"])
+
+        again = self.start(expected_status=200)
+        self.assertNotEqual(again["job_id"], first["job_id"])
+        self.assertEqual(again["status"], "done")
+        self.assertEqual(self.download(again["job_id"]).status_code, 200)
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+        self.approved_team(1)
+        self.assertEqual(self.start()["status"], "pending")
+        self.assertEqual(self.executor.submit.call_count, 2)
+
+    def test_unknown_and_unfinished_jobs(self):
+        missing = uuid.uuid4()
+        self.assertEqual(self.status(missing).status_code, 404)
+        self.assertEqual(self.download(missing).status_code, 404)
+
+        job = self.start()
+        response = self.download(job["job_id"])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["status"], "pending")
+
+    def test_failed_job_reports_error(self):
+        job = self.start()
+        with mock.patch.object(export_jobs, "write_approved_teams_workbook", side_effect=OSError("disk full")), \
+                self.assertLogs("teams.utils.export_jobs", "ERROR"):
+            export_jobs._run_job(job["job_id"])
+        self.assertEqual(self.status(job["job_id"]).data["error"], "disk full")
+        self.assertEqual(self.download(job["job_id"]).status_code, 409)
+
+
+class ExportExecutorTests(TestCase):
+    def test_executor_is_created_on_first_use(self):
+        with mock.patch.object(export_jobs, "_executor", None):
+            executor = export_jobs.get_executor()
+            self.addCleanup(executor.shutdown)
+            self.assertIs(export_jobs.get_executor(), executor)
+
+
+class ExcelExportTests(ApprovedTeamsMixin, TestCase):
+    url = "/api/teams/export-excel/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.dean = CustomUser.objects.create_user(email="dean@example.com", role="Dean Office")
+        self.client.force_authenticate(self.dean)
+        supervisor = CustomUser.objects.create_user(email="export.supervisor@example.com", role="Supervisor")
+        SupervisorProfile.objects.filter(pk=supervisor.pk).update(first_name="Ivan", last_name="Petrov", degree="PhD")
+        self.supervised = self.approved_team(0, members=2, supervisor=SupervisorProfile.objects.get(pk=supervisor.pk))
+        self.unsupervised = self.approved_team(1)
+        self.empty = self.approved_team(2, members=0)
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, getattr(response, "data", None))
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        return self.workbook_rows(content)
+
+    def test_both_modes_write_the_same_cells(self):
+        expected = [
+            ("№", "Студент", "Тема", "Супервайзер"),
+            (1, "Team0 Name0", "Каз: Такырып 0\nРус: Тема 0\nАнгл: Topic 0", "Petrov Ivan, PhD"),
+            (2, "Team0 Name1", None, None),
+            (3, "Team1 Name0", "Каз: Такырып 1\nРус: Тема 1\nАнгл: Topic 1", "—"),
+        ]
+        for params in ({}, {"mode": "stream"}):
+            with self.subTest(**params):
+                # Team 2 has no members and gets no rows
+                self.assertEqual(self.export(**params), expected)
+
+    def test_stream_mode_is_sent_in_blocks(self):
+        response = self.client.get(self.url, {"mode": "stream"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(int(response["Content-Length"]), len(b"".join(response.streaming_content)))
+
+    def test_query_count_does_not_grow_with_teams(self):
+        for params in ({}, {"mode": "stream"}):
+            with self.subTest(**params):
+                with CaptureQueriesContext(connection) as before:
+                    self.export(**params)
+                for i in range(3, 6):
+                    self.approved_team(i + 10 * len(params), members=2)
+                with CaptureQueriesContext(connection) as after:
+                    self.export(**params)
+                self.assertEqual(len(after), len(before))
+
+    def test_only_dean_office(self):
+        self.client.force_authenticate(self.supervised.owner)
+        self.assertEqual(self.client.get(self.url, {"mode": "stream"}).status_code, 403)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class SkillMatchingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(skill_index, "_index", skill_index.SkillIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.python, self.django, self.sql, self.ml = (Skill.objects.create(name=n) for n in ("Python", "Django", "SQL", "ML"))
+
+    def student(self, name, *skills):
+        user = CustomUser.objects.create_user(email=f"{name}@example.com", role="Student")
+        with self.captureOnCommitCallbacks(execute=True):
+            user.student_profile.skills.set(skills)
+        return user.student_profile
+
+    def team(self, name, *skills, status="pending"):
+        owner = CustomUser.objects.create_user(email=f"{name}.owner@example.com", role="Student")
+        topic = ThesisTopic.objects.create(title=name, description="...")
+        with self.captureOnCommitCallbacks(execute=True):
+            topic.required_skills.set(skills)
+        team = Team.objects.create(thesis_topic=topic, owner=owner, status=status)
+        team.add_member(owner.student_profile)
+        return team
+
+    def recommended(self, student):
+        self.client.force_authenticate(student.user)
+        response = self.client.get("/api/teams/recommended/")
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(row["team"]["id"], row["fills_gap"], row["matched_skill_count"]) for row in response.data]
+
+    def test_masks_round_trip(self):
+        ids = [self.python.id, self.ml.id, 70]
+        self.assertEqual(sorted(skill_index.mask_skill_ids(skill_index.skill_mask(ids))), sorted(ids))
+        self.assertEqual(skill_index.overlap(skill_index.skill_mask(ids), skill_index.skill_mask([self.ml.id, 3])),
+                         1 + (3 in ids))
+
+    def test_index_follows_skill_changes(self):
+        student = self.student("ann", self.python)
+        index = skill_index.get_skill_index()
+        self.assertEqual(index.student_mask(student.pk), skill_index.skill_mask([self.python.id]))
+
+        # The signal updates the entry in place and keeps this process's copy current
+        with self.captureOnCommitCallbacks(execute=True):
+            student.skills.add(self.sql)
+        version = cache.get(skill_index.VERSION_KEY)
+        with mock.patch.object(skill_index.SkillIndex, "build") as build:
+            index = skill_index.get_skill_index()
+        build.assert_not_called()
+        self.assertEqual(index.version, version)
+        self.assertEqual(index.student_mask(student.pk), skill_index.skill_mask([self.python.id, self.sql.id]))
+
+    def test_version_bump_rebuilds_index(self):
+        student = self.student("ann", self.python)
+        skill_index.get_skill_index()
+
+        # A write this process never saw, e.g. from another worker
+        StudentProfile.skills.through.objects.create(studentprofile=student, skill=self.ml)
+        self.assertFalse(skill_index.get_skill_index().student_mask(student.pk) & (1 << self.ml.id))
+
+        skill_index.invalidate_skill_index()
+        self.assertTrue(skill_index.get_skill_index().student_mask(student.pk) & (1 << self.ml.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ml.delete()
+        self.assertEqual(skill_index.get_skill_index().student_mask(student.pk), 1 << self.python.id)
+
+    def test_recommended_teams_are_ranked_and_joinable(self):
+        student = self.student("ann", self.python, self.sql)
+        covered = self.team("covered", self.python, self.sql)
+        covered.owner.student_profile.skills.add(self.python)
+        gap = self.team("gap", self.python, self.sql, self.ml)
+        partial = self.team("partial", self.sql)
+        self.team("unrelated", self.ml)
+        self.team("approved", self.python, self.sql, status="approved")
+        self.team("rejected", self.python, self.sql, status="rejected")
+        full = self.team("full", self.python, self.sql)
+        Team.objects.filter(pk=full.pk).update(member_count=MAX_TEAM_MEMBERS)
+        skill_index.invalidate_skill_index()
+
+        self.assertEqual(self.recommended(student), [(gap.id, 2, 2), (covered.id, 1, 2), (partial.id, 1, 1)])
+
+        covered.add_member(student)
+        self.client.force_authenticate(student.user)
+        self.assertEqual(self.client.get("/api/teams/recommended/").status_code, 400)
+
+    def test_candidate_students_cover_missing_skills(self):
+        team = self.team("team", self.python, self.sql, self.ml)
+        with self.captureOnCommitCallbacks(execute=True):
+            team.owner.student_profile.skills.add(self.python)
+        both = self.student("both", self.sql, self.ml)
+        one = self.student("one", self.python, self.ml)
+        overlap_only = self.student("overlap", self.python)
+        self.student("none", self.django)
+        member = self.student("member", self.ml)
+        team.add_member(member)
+
+        url = f"/api/teams/{team.id}/candidate-students/"
+        self.client.force_authenticate(team.owner)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            [(row["student"]["user"], row["fills_gap"], row["gap_skill_ids"]) for row in response.data],
+            [(both.pk, 1, [self.sql.id]), (one.pk, 0, []), (overlap_only.pk, 0, [])],
+        )
+
+        self.client.force_authenticate(member.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_candidates_skip_students_of_other_teams(self):
+        team = self.team("team", self.python, self.sql)
+        busy = [self.student(f"busy{i}", self.python, self.sql) for i in range(5)]
+        other = self.team("other")
+        for student in busy[:3]:
+            other.add_member(student)
+        free = self.student("free", self.sql)
+
+        with CaptureQueriesContext(connection) as ctx:
+            ranked = recommendations.recommend_students(team, limit=1)
+        self.assertEqual([row[0] for row in ranked], [busy[3].pk])
+        # Memberships are only read for this team and for the ranked students
+        membership_queries = [q["sql"] for q in ctx.captured_queries if '"teams_membership"' in q["sql"]]
+        self.assertTrue(membership_queries)
+        self.assertTrue(all(" WHERE " in sql for sql in membership_queries), membership_queries)
+        self.assertEqual([row[0] for row in recommendations.recommend_students(team, limit=3)],
+                         [busy[3].pk, busy[4].pk, free.pk])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class SeedScaleTests(TestCase):
+    options = dict(students=30, supervisors=4, deans=1, skills=6, teams=8, chats=10, messages=3,
+                   notifications=2, batch_size=7, seed=1)
+
+    def seed(self, **options):
+        call_command("seed_scale", **{**self.options, **options}, stdout=io.StringIO())
+
+    def test_counters_match_rows(self):
+        self.seed()
+        teams = Team.objects.annotate(members_n=Count("members", distinct=True), likes_n=Count("like", distinct=True))
+        self.assertEqual(teams.count(), 8)
+        for team in teams:
+            self.assertEqual((team.member_count, team.like_count), (team.members_n, team.likes_n))
+
+        for profile in SupervisorProfile.objects.annotate(teams_n=Count("team")):
+            self.assertEqual(profile.supervised_team_count, profile.teams_n)
+
+        chats = Chat.objects.prefetch_related("participants")
+        self.assertEqual(chats.count(), 10)
+        for chat in chats:
+            self.assertEqual(chat.direct_key, Chat.direct_key_for(*[user.pk for user in chat.participants.all()]))
+
+    def test_failed_run_leaves_nothing_behind(self):
+        with mock.patch("teams.management.commands.seed_scale.counters.invalidate", side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                self.seed()
+        self.assertFalse(CustomUser.objects.filter(email__startswith="seed.").exists())
+
+        self.seed()
+        self.assertEqual(CustomUser.objects.filter(email__startswith="seed.").count(), 35)
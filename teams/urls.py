@@ -4,17 +4,23 @@ from .views import TeamCreateView, TeamListView, TeamDetailView, \
     MyJoinRequestsView, MyTeamJoinRequestsView, CreateSupervisorRequestView, IncomingSupervisorRequestsView, \
     AcceptSupervisorRequestView, RejectSupervisorRequestView, CancelSupervisorRequestView, SupervisorProjectsView, \
     MySupervisorRequestView, LikedProjectsView, LikeToggleView, LeaveTeamView, RemoveTeamMemberView, \
-    SupervisorDeleteTeamView, ApproveTeamView, ApprovedTeamsForDeanView, ExportApprovedTeamsExcelView
+    SupervisorDeleteTeamView, ApproveTeamView, ApprovedTeamsForDeanView, ExportApprovedTeamsExcelView, \
+    ExportJobCreateView, ExportJobStatusView, ExportJobDownloadView, TopProjectsView, RecommendedTeamsView, \
+    CandidateStudentsView, SupervisorMatchesView, BulkJoinRequestModerationView
 
 urlpatterns = [
     path('create/', TeamCreateView.as_view(), name='create-team'),
     path('', TeamListView.as_view(), name='list-teams'),
     path('<int:pk>/', TeamDetailView.as_view(), name='team-detail'),
+    path('recommended/', RecommendedTeamsView.as_view(), name='recommended-teams'),
+    path('<int:pk>/candidate-students/', CandidateStudentsView.as_view(), name='candidate-students'),
     path('my-team-join-requests/', MyTeamJoinRequestsView.as_view(), name='my-team-join-requests'),
     path('<int:pk>/join-requests/<int:student_id>/accept/', AcceptJoinRequestView.as_view(),
          name='accept-join-request'),
     path('<int:pk>/join-requests/<int:student_id>/reject/', RejectJoinRequestView.as_view(),
          name='reject-join-request'),
+    path('<int:pk>/join-requests/bulk/', BulkJoinRequestModerationView.as_view(),
+         name='bulk-moderate-join-requests'),
     path('<int:pk>/join/', JoinTeamView.as_view(), name='join-team'),
     path('my-join-requests/', MyJoinRequestsView.as_view(), name='my-join-requests'),
     path('my-join-requests/<int:pk>/', MyJoinRequestsView.as_view(), name='cancel-join-request'),
@@ -22,6 +28,7 @@ urlpatterns = [
     path('my-projects/', SupervisorProjectsView.as_view(), name='supervisor-projects'),
     path('my-join-request/', MyJoinRequestView.as_view(), name='my-join-request'),
     path('my-supervisor-request/', MySupervisorRequestView.as_view()),
+    path('supervisor-matches/', SupervisorMatchesView.as_view(), name='supervisor-matches'),
     path('supervisor-request/<int:supervisor_id>/', CreateSupervisorRequestView.as_view(),
          name='supervisor-request-create'),
     path('supervisor-requests/incoming/', IncomingSupervisorRequestsView.as_view()),
@@ -30,10 +37,14 @@ urlpatterns = [
     path('supervisor-requests/cancel/', CancelSupervisorRequestView.as_view()),
     path('likes/', LikedProjectsView.as_view(), name='liked-projects'),
     path('likes/toggle/<int:team_id>/', LikeToggleView.as_view(), name='like-toggle'),
+    path('likes/top/', TopProjectsView.as_view(), name='top-projects'),
     path('leave/', LeaveTeamView.as_view(), name='leave-team'),
     path('<int:pk>/supervisor-delete/', SupervisorDeleteTeamView.as_view(), name='supervisor-delete-team'),
     path('<int:pk>/remove-member/<int:student_id>/', RemoveTeamMemberView.as_view(), name='remove-member'),
     path('<int:pk>/approve/', ApproveTeamView.as_view(), name='approve-team'),
     path('approved/', ApprovedTeamsForDeanView.as_view(), name='approved-teams'),
     path('export-excel/', ExportApprovedTeamsExcelView.as_view(), name='export-approved-teams-excel'),
+    path('export-excel/jobs/', ExportJobCreateView.as_view(), name='export-job-create'),
+    path('export-excel/jobs/<uuid:job_id>/', ExportJobStatusView.as_view(), name='export-job-status'),
+    path('export-excel/jobs/<uuid:job_id>/download/', ExportJobDownloadView.as_view(), name='export-job-download'),
 ]
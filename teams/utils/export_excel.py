@@ -1,17 +1,54 @@
+import tempfile
+
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment
 from openpyxl.utils import get_column_letter
-from django.http import HttpResponse
+from django.db.models import Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
 
-def generate_excel_for_approved_teams(request):
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXPORT_FILENAME = "diploma_projects_.xlsx"
+HEADER = ["№", "Студент", "Тема", "Супервайзер"]
+COL_WIDTHS = [5, 35, 55, 40]
+
+# How many teams are fetched (with their members) per round-trip in streaming mode
+STREAM_CHUNK_SIZE = 500
+# Size of the pieces the finished file is sent to the client in
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def _topic_text(thesis):
+    return (
+        f"Каз: {thesis.title_kz}\n"
+        f"Рус: {thesis.title_ru}\n"
+        f"Англ: {thesis.title}"
+    )
+
+
+def _supervisor_text(supervisor):
+    if supervisor is None:
+        return "—"
+    return f"{supervisor.last_name} {supervisor.first_name}, {supervisor.degree}"
+
+
+def _approved_teams():
     from teams.models import Team
-    teams = Team.objects.filter(status="approved").prefetch_related("members", "thesis_topic", "supervisor")
+    from profiles.models import StudentProfile
+
+    return Team.objects.filter(status="approved").select_related("thesis_topic", "supervisor").prefetch_related(
+        Prefetch("members", queryset=StudentProfile.objects.only("user_id", "first_name", "last_name"))
+    )
+
+
+def generate_excel_for_approved_teams(request):
+    teams = _approved_teams()
 
     wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = "Approved Teams"
 
-    ws.append(["№", "Студент", "Тема", "Супервайзер"])
+    ws.append(HEADER)
 
     bold_font = Font(bold=True)
     wrap = Alignment(wrap_text=True, vertical="top")
@@ -20,16 +57,10 @@ def generate_excel_for_approved_teams(request):
     count = 1
 
     for team in teams:
-        supervisor = team.supervisor
         thesis = team.thesis_topic
         members = list(team.members.all())
-
-        topic_text = (
-            f"Каз: {thesis.title_kz}\n"
-            f"Рус: {thesis.title_ru}\n"
-            f"Англ: {thesis.title}"
-        )
-        supervisor_text = f"{supervisor.last_name} {supervisor.first_name}, {supervisor.degree}"
+        if not members:
+            continue
 
         for student in members:
             ws.append([count, f"{student.last_name} {student.first_name}", "", ""])
@@ -41,20 +72,84 @@ def generate_excel_for_approved_teams(request):
         ws.merge_cells(start_row=start_merge, end_row=end_merge, start_column=3, end_column=3)
         ws.merge_cells(start_row=start_merge, end_row=end_merge, start_column=4, end_column=4)
 
-        topic_cell = ws.cell(row=start_merge, column=3, value=topic_text)
+        topic_cell = ws.cell(row=start_merge, column=3, value=_topic_text(thesis))
         topic_cell.font = Font(name='Calibri')
         topic_cell.alignment = wrap
 
-        supervisor_cell = ws.cell(row=start_merge, column=4, value=supervisor_text)
+        supervisor_cell = ws.cell(row=start_merge, column=4, value=_supervisor_text(team.supervisor))
         supervisor_cell.font = Font(name='Calibri')
         supervisor_cell.alignment = wrap
 
-    col_widths = [5, 35, 55, 40]
-    for i, width in enumerate(col_widths, start=1):
+    for i, width in enumerate(COL_WIDTHS, start=1):
         ws.column_dimensions[get_column_letter(i)].width = width
 
-    response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    filename = f"diploma_projects_.xlsx"
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
+    response["Content-Disposition"] = f'attachment; filename="{EXPORT_FILENAME}"'
     wb.save(response)
     return response
+
+
+def write_approved_teams_workbook(fileobj):
+    """
+    Writes the approved-teams sheet into `fileobj` using openpyxl's write-only mode.
+
+    Rows are flushed to disk as they are appended and teams are read from the
+    database in chunks, so memory use doesn't depend on the number of teams.
+    Write-only sheets can't merge cells, so the topic and supervisor are written
+    on the first row of each team instead.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Approved Teams")
+    for i, width in enumerate(COL_WIDTHS, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+
+    ws.append(HEADER)
+
+    font = Font(name='Calibri')
+    wrap = Alignment(wrap_text=True, vertical="top")
+
+    def styled(value):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = font
+        cell.alignment = wrap
+        return cell
+
+    count = 1
+    for team in _approved_teams().iterator(chunk_size=STREAM_CHUNK_SIZE):
+        for index, student in enumerate(team.members.all()):
+            if index == 0:
+                topic, supervisor = styled(_topic_text(team.thesis_topic)), styled(_supervisor_text(team.supervisor))
+            else:
+                topic, supervisor = "", ""
+            ws.append([count, f"{student.last_name} {student.first_name}", topic, supervisor])
+            count += 1
+
+    wb.save(fileobj)
+
+
+def _iter_file(fileobj):
+    try:
+        while True:
+            block = fileobj.read(STREAM_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+    finally:
+        fileobj.close()
+
+
+def stream_excel_for_approved_teams(request):
+    """ Streaming, constant-memory variant of generate_excel_for_approved_teams """
+    tmp = tempfile.TemporaryFile()
+    try:
+        write_approved_teams_workbook(tmp)
+        size = tmp.tell()
+        tmp.seek(0)
+    except Exception:
+        tmp.close()
+        raise
+
+    response = StreamingHttpResponse(_iter_file(tmp), content_type=XLSX_CONTENT_TYPE)
+    response["Content-Disposition"] = f'attachment; filename="{EXPORT_FILENAME}"'
+    response["Content-Length"] = str(size)
+    return response
@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from .export_excel import write_approved_teams_workbook
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.path.join(settings.MEDIA_ROOT, "exports")
+JOB_TTL = 60 * 60 * 24  # job records and finished files are kept for a day
+# A build's "running" marker expires this long after its process stops refreshing it
+RUNNING_TTL = 2 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.EXPORT_JOB_WORKERS, thread_name_prefix="excel-export")
+    return _executor
+
+
+# Fingerprints whose running marker this process owns and keeps alive
+_owned = set()
+_heartbeat = None
+_heartbeat_lock = threading.Lock()
+
+
+def refresh_running_markers():
+    for fingerprint in list(_owned):
+        cache.touch(_running_key(fingerprint), RUNNING_TTL)
+
+
+def _keep_alive():
+    while True:
+        time.sleep(RUNNING_TTL / 4)
+        refresh_running_markers()
+
+
+def _own(fingerprint):
+    global _heartbeat
+    _owned.add(fingerprint)
+    if _heartbeat is None:
+        with _heartbeat_lock:
+            if _heartbeat is None:
+                _heartbeat = threading.Thread(target=_keep_alive, name="excel-export-heartbeat", daemon=True)
+                _heartbeat.start()
+
+
+def _job_key(job_id):
+    return f"export_job:{job_id}"
+
+
+def _result_key(fingerprint):
+    return f"export_result:{fingerprint}"
+
+
+def _running_key(fingerprint):
+    return f"export_running:{fingerprint}"
+
+
+def result_path(fingerprint):
+    return os.path.join(EXPORT_DIR, f"approved_teams_{fingerprint}.xlsx")
+
+
+def approved_teams_fingerprint():
+    """
+    Hash of everything that ends up in the approved-teams workbook.
+
+    Two narrow `values_list` queries, much cheaper than building the file, so
+    an unchanged dataset can be answered from the previous result.
+    """
+    from teams.models import Team, Membership
+
+    digest = hashlib.sha256()
+    teams = Team.objects.filter(status="approved").order_by("id").values_list(
+        "id", "thesis_topic__title", "thesis_topic__title_kz", "thesis_topic__title_ru",
+        "supervisor_id", "supervisor__first_name", "supervisor__last_name", "supervisor__degree",
+    )
+    for row in teams.iterator():
+        digest.update(repr(row).encode())
+
+    members = Membership.objects.filter(team__status="approved").order_by("team_id", "student_id").values_list(
+        "team_id", "student_id", "student__first_name", "student__last_name",
+    )
+    for row in members.iterator():
+        digest.update(repr(row).encode())
+
+    return digest.hexdigest()[:32]
+
+
+def get_job(job_id):
+    return cache.get(_job_key(job_id))
+
+
+def _save_job(job):
+    cache.set(_job_key(job["id"]), job, timeout=JOB_TTL)
+    return job
+
+
+def submit_export_job(user):
+    """
+    Creates an export job for the approved-teams workbook and returns its record.
+
+    If a file for the current dataset already exists the job is finished
+    immediately; if one is being built, the running job is returned instead
+    of starting a second build. The "running" marker lives RUNNING_TTL
+    seconds and is refreshed while its process is alive, so a build lost to
+    a killed worker stops blocking new ones within minutes.
+    """
+    fingerprint = approved_teams_fingerprint()
+    job = {
+        "id": str(uuid.uuid4()),
+        "status": "pending",
+        "fingerprint": fingerprint,
+        "requested_by": user.id,
+        "created_at": time.time(),
+        "error": None,
+    }
+
+    cached_path = cache.get(_result_key(fingerprint))
+    if cached_path and os.path.exists(cached_path):
+        job["status"] = "done"
+        return _save_job(job)
+
+    key = _running_key(fingerprint)
+    if not cache.add(key, job["id"], timeout=RUNNING_TTL):
+        stale_id = cache.get(key)
+        running = get_job(stale_id)
+        if running:
+            return running
+        # The marker outlived its job record: take it over, unless someone already has
+        if cache.get(key) == stale_id:
+            cache.delete(key)
+        if not cache.add(key, job["id"], timeout=RUNNING_TTL):
+            running = get_job(cache.get(key))
+            if running:
+                return running
+
+    _own(fingerprint)
+    _save_job(job)
+    get_executor().submit(_run_job, job["id"])
+    return job
+
+
+def _prune_old_exports():
+    cutoff = time.time() - JOB_TTL
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _run_job(job_id):
+    close_old_connections()
+    job = get_job(job_id)
+    if job is None:
+        return
+
+    fingerprint = job["fingerprint"]
+    path = result_path(fingerprint)
+    tmp_path = f"{path}.{job_id}.tmp"
+    job["status"] = "running"
+    _save_job(job)
+
+    try:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            write_approved_teams_workbook(f)
+        os.replace(tmp_path, path)
+
+        cache.set(_result_key(fingerprint), path, timeout=JOB_TTL)
+        job["status"] = "done"
+        _prune_old_exports()
+    except Exception as e:
+        logger.exception("Excel export job %s failed", job_id)
+        job["status"] = "failed"
+        job["error"] = str(e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    finally:
+        _save_job(job)
+        _owned.discard(fingerprint)
+        if cache.get(_running_key(fingerprint)) == job_id:
+            cache.delete(_running_key(fingerprint))
+        close_old_connections()
+
+
+def job_file_path(job):
+    """ Path of a finished job's file, or None if it is not (or no longer) available """
+    if job["status"] != "done":
+        return None
+    path = result_path(job["fingerprint"])
+    return path if os.path.exists(path) else None
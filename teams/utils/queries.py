@@ -0,0 +1,59 @@
+from django.db.models import Exists, OuterRef, Prefetch
+
+
+def team_prefetches(prefix=""):
+    """
+    Prefetch lookups needed to serialize a team with TeamSerializer.
+
+    `prefix` lets models that point at a team (join requests, supervisor
+    requests, ...) reuse the same lookups, e.g. prefix="team__".
+    """
+    from profiles.models import StudentProfile
+
+    return [
+        Prefetch(
+            f"{prefix}members",
+            queryset=StudentProfile.objects.select_related("user").prefetch_related("skills"),
+        ),
+        f"{prefix}thesis_topic__required_skills",
+    ]
+
+
+def team_select_related(prefix=""):
+    """ Forward relations TeamSerializer reads on every row """
+    return [f"{prefix}thesis_topic", f"{prefix}supervisor__user"]
+
+
+def annotate_liked_by(queryset, user):
+    """ Adds `liked_by_me` as an EXISTS subquery, so it costs no extra query per row """
+    from teams.models import Like
+
+    if not getattr(user, "is_authenticated", False):
+        return queryset
+    return queryset.annotate(liked_by_me=Exists(Like.objects.filter(team=OuterRef("pk"), user=user)))
+
+
+def with_team_relations(queryset=None, user=None):
+    """
+    Returns a Team queryset that TeamSerializer can render with a fixed
+    number of queries, no matter how many teams are in it.
+
+    Pass the requesting `user` to fill in `liked_by_me`.
+    """
+    if queryset is None:
+        from teams.models import Team
+        queryset = Team.objects.all()
+
+    queryset = queryset.select_related(*team_select_related()).prefetch_related(*team_prefetches())
+    return annotate_liked_by(queryset, user)
+
+
+def join_request_queryset(queryset, compact=False):
+    """
+    JoinRequest queryset for JoinRequestSerializer (or, with compact=True,
+    JoinRequestCompactSerializer, which only needs the student).
+    """
+    queryset = queryset.select_related("student__user").prefetch_related("student__skills")
+    if compact:
+        return queryset
+    return queryset.select_related(*team_select_related("team__")).prefetch_related(*team_prefetches("team__"))
@@ -0,0 +1,108 @@
+from .skill_index import get_skill_index, overlap
+
+
+def _team_member_ids(team_ids=None):
+    from teams.models import Membership
+
+    memberships = Membership.objects.all()
+    if team_ids is not None:
+        memberships = memberships.filter(team_id__in=team_ids)
+
+    members = {}
+    for team_id, student_id in memberships.values_list("team_id", "student_id"):
+        members.setdefault(team_id, []).append(student_id)
+    return members
+
+
+def recommend_teams(student, limit=10):
+    """
+    Ranks teams `student` can still join (pending approval, with a free
+    place) by how well the student fits them.
+
+    Primary score: how many of the topic's still-uncovered skills the student
+    brings; secondary: total overlap with the topic's required skills.
+    Returns a list of (team_id, fills_gap, overlap, matched_mask).
+    """
+    from teams.models import Team, MAX_TEAM_MEMBERS
+
+    index = get_skill_index()
+    student_mask = index.student_mask(student.pk)
+
+    candidates = list(
+        Team.objects.filter(status="pending", member_count__lt=MAX_TEAM_MEMBERS).exclude(members=student)
+        .values_list("id", "thesis_topic_id")
+    )
+    members = _team_member_ids([team_id for team_id, _ in candidates])
+
+    scored = []
+    for team_id, topic_id in candidates:
+        topic_mask = index.topic_mask(topic_id)
+        matched = student_mask & topic_mask
+        if not matched:
+            continue
+        gap = topic_mask & ~index.team_mask(members.get(team_id, ()))
+        scored.append((team_id, overlap(student_mask, gap), matched.bit_count(), matched))
+
+    scored.sort(key=lambda row: (-row[1], -row[2], row[0]))
+    return scored[:limit]
+
+
+def recommend_students(team, limit=10):
+    """
+    Ranks students who are not in any team by how many of `team`'s missing
+    skills they would cover. Returns (student_id, fills_gap, overlap, gap_mask).
+
+    Everyone in the index is scored; team membership is then looked up only
+    for the best-ranked students, a few `limit`s at a time, instead of
+    loading every membership row.
+    """
+    from teams.models import Membership
+
+    index = get_skill_index()
+    topic_mask = index.topic_mask(team.thesis_topic_id)
+    team_mask = index.team_mask(Membership.objects.filter(team=team).values_list("student_id", flat=True))
+    gap = topic_mask & ~team_mask
+
+    scored = []
+    for student_id, student_mask in index.students.items():
+        fills = student_mask & gap
+        matched = (student_mask & topic_mask).bit_count()
+        if not matched:
+            continue
+        scored.append((student_id, fills.bit_count(), matched, fills))
+    scored.sort(key=lambda row: (-row[1], -row[2], row[0]))
+
+    free = []
+    chunk = max(limit, 1) * 4
+    for start in range(0, len(scored), chunk):
+        rows = scored[start:start + chunk]
+        taken = set(Membership.objects.filter(student_id__in=[row[0] for row in rows])
+                    .values_list("student_id", flat=True))
+        free += [row for row in rows if row[0] not in taken]
+        if len(free) >= limit:
+            break
+    return free[:limit]
+
+
+def recommend_supervisors(team, limit=10):
+    """
+    Ranks supervisors with free capacity by overlap with the team's required
+    skills, then by remaining capacity. Capacity comes from the maintained
+    SupervisorProfile.supervised_team_count, so no per-supervisor COUNT runs.
+    Returns (supervisor_id, overlap, remaining_capacity, matched_mask).
+    """
+    from profiles.models import SupervisorProfile
+    from teams.models import SUPERVISOR_TEAM_LIMIT
+
+    index = get_skill_index()
+    topic_mask = index.topic_mask(team.thesis_topic_id)
+
+    scored = []
+    available = SupervisorProfile.objects.filter(supervised_team_count__lt=SUPERVISOR_TEAM_LIMIT) \
+        .values_list("pk", "supervised_team_count")
+    for supervisor_id, team_count in available:
+        matched = index.supervisor_mask(supervisor_id) & topic_mask
+        scored.append((supervisor_id, matched.bit_count(), SUPERVISOR_TEAM_LIMIT - team_count, matched))
+
+    scored.sort(key=lambda row: (-row[1], -row[2], row[0]))
+    return scored[:limit]
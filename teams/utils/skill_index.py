@@ -0,0 +1,127 @@
+import threading
+
+from django.core.cache import cache
+
+VERSION_KEY = "skill_index:version"
+
+
+def skill_mask(skill_ids):
+    """ Packs skill ids into an int bitset: bit n is set when skill n is present """
+    mask = 0
+    for skill_id in skill_ids:
+        mask |= 1 << skill_id
+    return mask
+
+
+def mask_skill_ids(mask):
+    """ Inverse of skill_mask """
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+def overlap(a, b):
+    return (a & b).bit_count()
+
+
+class SkillIndex:
+    """
+    In-memory skill bitsets for students, supervisors and thesis topics.
+
+    Scoring a candidate is a single AND + popcount on two ints, so ranking
+    every open team (or every free student) costs one pass over a dict
+    instead of nested `.all()` calls. The index is built from the M2M
+    through tables in three queries and kept current by m2m_changed signals
+    (see teams/signals.py). Other processes notice changes through a shared
+    version number in the cache and rebuild on their next read.
+    """
+
+    def __init__(self):
+        self.students = {}
+        self.supervisors = {}
+        self.topics = {}
+        self.version = None
+        self._lock = threading.Lock()
+
+    def build(self, version):
+        from profiles.models import StudentProfile, SupervisorProfile
+        from topics.models import ThesisTopic
+
+        students, supervisors, topics = {}, {}, {}
+        for student_id, skill_id in StudentProfile.skills.through.objects.values_list("studentprofile_id", "skill_id"):
+            students[student_id] = students.get(student_id, 0) | (1 << skill_id)
+        for supervisor_id, skill_id in SupervisorProfile.skills.through.objects.values_list(
+                "supervisorprofile_id", "skill_id"):
+            supervisors[supervisor_id] = supervisors.get(supervisor_id, 0) | (1 << skill_id)
+        for topic_id, skill_id in ThesisTopic.required_skills.through.objects.values_list("thesistopic_id", "skill_id"):
+            topics[topic_id] = topics.get(topic_id, 0) | (1 << skill_id)
+
+        self.students, self.supervisors, self.topics = students, supervisors, topics
+        self.version = version
+
+    def student_mask(self, student_id):
+        return self.students.get(student_id, 0)
+
+    def supervisor_mask(self, supervisor_id):
+        return self.supervisors.get(supervisor_id, 0)
+
+    def topic_mask(self, topic_id):
+        return self.topics.get(topic_id, 0)
+
+    def team_mask(self, student_ids):
+        mask = 0
+        for student_id in student_ids:
+            mask |= self.student_mask(student_id)
+        return mask
+
+
+_index = SkillIndex()
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def _bump_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        return cache.get(VERSION_KEY, 1)
+
+
+def get_skill_index():
+    """ Returns the process-wide index, rebuilding it if another process changed skills """
+    version = _current_version()
+    if _index.version != version:
+        with _index._lock:
+            if _index.version != version:
+                _index.build(version)
+    return _index
+
+
+def invalidate_skill_index():
+    """ Forces a full rebuild everywhere on the next read """
+    _bump_version()
+
+
+def update_entry(kind, pk, mask):
+    """
+    Updates one student's, supervisor's or topic's bitset in place.
+
+    The local index stays warm (it adopts the new version if it was current
+    before the change); other processes see the bumped version and rebuild.
+    """
+    with _index._lock:
+        was_current = _index.version is not None and _index.version == cache.get(VERSION_KEY)
+        getattr(_index, kind)[pk] = mask
+        version = _bump_version()
+        if was_current:
+            _index.version = version
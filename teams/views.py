@@ -1,39 +1,47 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
 from profiles.models import SupervisorProfile, StudentProfile
+from profiles.serializers import StudentProfileSerializer, SupervisorShortSerializer
 from topics.models import ThesisTopic
 from topics.serializers import ThesisTopicSerializer
-from .models import Team, JoinRequest, SupervisorRequest, Like, Membership
-from .serializers import TeamSerializer, JoinRequestSerializer, SupervisorRequestSerializer
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from notifications.models import Notification
+from .models import Team, JoinRequest, SupervisorRequest, Like, Membership, MAX_TEAM_MEMBERS, SUPERVISOR_TEAM_LIMIT
+from .serializers import TeamSerializer, JoinRequestSerializer, JoinRequestCompactSerializer, \
+    SupervisorRequestSerializer
+from notifications.outbox import NotificationOutbox
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .utils.export_excel import generate_excel_for_approved_teams
+from .utils.export_excel import generate_excel_for_approved_teams, stream_excel_for_approved_teams, EXPORT_FILENAME
+from .utils.export_jobs import submit_export_job, get_job, job_file_path
+from .utils.queries import with_team_relations, join_request_queryset
+from .utils.recommendations import recommend_teams, recommend_students, recommend_supervisors
+from .utils.skill_index import mask_skill_ids
+from DTest.pagination import TeamPagination
 from datetime import datetime
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse
 
-def send_notification(user, message):
+def send_notification(user, message, digest_key=""):
     """ 
     Sends a notification to a user (DB + WebSocket)
+
+    The row is written in the current transaction; the WebSocket push happens
+    after commit (see notifications.outbox).
+    Use NotificationOutbox directly to send several notifications at once.
     
     Args:
         user: User to send notification to
         message: Notification message content
+        digest_key: Repetitive notifications with the same key are collapsed
+            into one digest by prune_notifications
     """
-    Notification.objects.create(user=user, message=message)
-
-    # Send real-time notification via WebSocket
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f"user_{user.id}",
-        {"type": "send_notification", "message": message},
-    )
+    with NotificationOutbox() as outbox:
+        outbox.add(user, message, digest_key)
 
 
 class TeamCreateView(generics.CreateAPIView):
@@ -60,6 +68,10 @@ class TeamCreateView(generics.CreateAPIView):
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
 
+    def perform_create(self, serializer):
+        # Только что созданную команду ещё никто не лайкал
+        serializer.save().liked_by_me = False
+
 
 class TeamListView(generics.ListAPIView):
     """
@@ -71,7 +83,11 @@ class TeamListView(generics.ListAPIView):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
     permission_classes = [permissions.AllowAny]
-    
+    pagination_class = TeamPagination
+
+    def get_queryset(self):
+        return with_team_relations(user=self.request.user)
+
     @swagger_auto_schema(
         operation_summary="List all teams",
         operation_description="Returns a list of all teams in the system",
@@ -93,7 +109,10 @@ class TeamDetailView(generics.RetrieveAPIView):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
     permission_classes = [permissions.AllowAny]
-    
+
+    def get_queryset(self):
+        return with_team_relations(user=self.request.user)
+
     @swagger_auto_schema(
         operation_summary="Get team details",
         operation_description="Retrieves detailed information about a specific team",
@@ -141,7 +160,7 @@ class MyTeamView(APIView):
         # 🧠 Если студент — верни команду, в которой он состоит
         if hasattr(user, "student_profile"):
             try:
-                team = Team.objects.get(members=user.student_profile)
+                team = with_team_relations(user=user).get(members=user.student_profile)
                 serializer = TeamSerializer(team)
                 data = serializer.data
                 data['is_owner'] = team.owner == request.user
@@ -151,8 +170,8 @@ class MyTeamView(APIView):
 
         # 🧠 Если супервизор — верни все команды, где он является owner
         elif hasattr(user, "supervisor_profile"):
-            teams = Team.objects.filter(owner=user)
-            if teams.exists():
+            teams = list(with_team_relations(Team.objects.filter(owner=user), user=user))
+            if teams:
                 serializer = TeamSerializer(teams, many=True)
                 return Response(serializer.data)
             else:
@@ -172,17 +191,19 @@ class SupervisorProjectsView(APIView):
         supervisor = request.user.supervisor_profile
 
         # 1. Темы, созданные супервизором
-        created_topics = ThesisTopic.objects.filter(created_by_supervisor=supervisor)
+        created_topics = list(
+            ThesisTopic.objects.filter(created_by_supervisor=supervisor).prefetch_related("required_skills")
+        )
         created_topics_data = ThesisTopicSerializer(created_topics, many=True).data
 
         # 2. Команды, где он назначен supervisor
-        supervised_teams = Team.objects.filter(supervisor=supervisor)
+        supervised_teams = list(with_team_relations(Team.objects.filter(supervisor=supervisor), user=request.user))
         supervised_teams_data = TeamSerializer(supervised_teams, many=True).data
 
         return Response({
             "created_topics": created_topics_data,
             "supervised_teams": supervised_teams_data,
-            "count": created_topics.count() + supervised_teams.count()
+            "count": len(created_topics) + len(supervised_teams)
         })
 
 
@@ -208,6 +229,24 @@ class MyJoinRequestView(APIView):
         return Response({"status": "no_request"}, status=200)
 
 
+def join_requests_response(request, queryset):
+    """
+    Serializes join requests. With ?compact=1 every request carries only a
+    team id and each team is serialized once in the side-loaded `teams` map.
+    """
+    if request.query_params.get("compact") not in ("1", "true"):
+        requests = join_request_queryset(queryset)
+        return Response(JoinRequestSerializer(requests, many=True).data)
+
+    requests = list(join_request_queryset(queryset, compact=True))
+    team_ids = {join_request.team_id for join_request in requests}
+    teams = list(with_team_relations(Team.objects.filter(pk__in=team_ids), user=request.user))
+    return Response({
+        "requests": JoinRequestCompactSerializer(requests, many=True).data,
+        "teams": {str(team.pk): data for team, data in zip(teams, TeamSerializer(teams, many=True).data)},
+    })
+
+
 class MyJoinRequestsView(APIView):
     """ Get all join requests of the current student """
     permission_classes = [IsAuthenticated]
@@ -216,9 +255,7 @@ class MyJoinRequestsView(APIView):
         if not hasattr(request.user, "student_profile"):
             return Response({"error": "Only students can view this."}, status=403)
 
-        requests = JoinRequest.objects.filter(student=request.user.student_profile)
-        serializer = JoinRequestSerializer(requests, many=True)
-        return Response(serializer.data)
+        return join_requests_response(request, JoinRequest.objects.filter(student=request.user.student_profile))
 
     def delete(self, request, pk):
         """ Cancel join request """
@@ -263,12 +300,16 @@ class JoinTeamView(APIView):
             return Response({"error": "You already sent a join request to this team."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # ✅ 4. Создание заявки
-        JoinRequest.objects.create(team=team, student=student_profile)
+        if team.is_full:
+            return Response({"error": "Team is already full."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # ✅ 4. Создание заявки (закрытая ранее заявка в эту команду открывается заново)
+        JoinRequest.objects.update_or_create(team=team, student=student_profile, defaults={"status": "pending"})
 
         # ✅ 5. Уведомление владельцу
         send_notification(team.owner,
-                          f"{student_profile.first_name} {student_profile.last_name} wants to join your team.")
+                          f"{student_profile.first_name} {student_profile.last_name} wants to join your team.",
+                          digest_key=f"join_request:{team.id}")
 
         return Response({"message": "Join request sent."}, status=status.HTTP_200_OK)
 
@@ -282,9 +323,7 @@ class MyTeamJoinRequestsView(APIView):
         if not teams.exists():
             return Response({"error": "You don't own any team."}, status=404)
 
-        all_requests = JoinRequest.objects.filter(team__in=teams).order_by('-created_at')
-        serializer = JoinRequestSerializer(all_requests, many=True)
-        return Response(serializer.data)
+        return join_requests_response(request, JoinRequest.objects.filter(team__in=teams).order_by('-created_at'))
 
 
 class MySupervisorRequestView(APIView):
@@ -313,31 +352,38 @@ class AcceptJoinRequestView(APIView):
 
     def post(self, request, pk, student_id):
         try:
-            team = Team.objects.get(pk=pk)
-            if team.owner != request.user:
-                return Response({"error": "Only the owner can accept requests."}, status=403)
-            if team.members.count() >= 4:
-                return Response({"error": "Team is already full."}, status=400)
-            join_request = JoinRequest.objects.get(team=team, student_id=student_id, status='pending')
-            team.members.add(join_request.student)
-            join_request.status = 'accepted'
-            join_request.save()
-
-            # Уведомляем принятого студента
-            send_notification(
-                join_request.student.user,
-                f"Your request to join '{team.thesis_topic.title}' was accepted."
-            )
-
-            # 💡 Если после добавления в команде уже 4 человека — удаляем все остальные pending заявки
-            if team.members.count() >= 4:
-                other_requests = JoinRequest.objects.filter(team=team, status="pending").exclude(student=student_id)
-                for req in other_requests:
-                    send_notification(
-                        req.student.user,
-                        f"Your request to join '{team.thesis_topic.title}' was automatically rejected because the team is now full."
+            with transaction.atomic(), NotificationOutbox() as outbox:
+                team = Team.objects.select_related("thesis_topic").get(pk=pk)
+                if team.owner != request.user:
+                    return Response({"error": "Only the owner can accept requests."}, status=403)
+
+                # 🔒 Блокируем заявку: два параллельных accept одной заявки не пройдут оба
+                join_request = JoinRequest.objects.select_for_update().get(
+                    team=team, student_id=student_id, status='pending'
+                )
+
+                # Проверка места и инкремент member_count — один условный UPDATE
+                if not team.add_member(join_request.student_id):
+                    return Response({"error": "Team is already full."}, status=400)
+
+                join_request.status = 'accepted'
+                join_request.save(update_fields=["status"])
+
+                # Уведомляем принятого студента (student_id профиля == id пользователя)
+                outbox.add(join_request.student_id, f"Your request to join '{team.thesis_topic.title}' was accepted.")
+
+                # 💡 Команда заполнена — закрываем остальные pending заявки одним UPDATE
+                if team.is_full:
+                    competing = list(
+                        JoinRequest.objects.filter(team=team, status="pending").values_list("id", "student_id")
                     )
-                other_requests.delete()
+                    JoinRequest.objects.filter(pk__in=[request_id for request_id, _ in competing]) \
+                        .update(status="rejected")
+                    for _, other_student_id in competing:
+                        outbox.add(
+                            other_student_id,
+                            f"Your request to join '{team.thesis_topic.title}' was automatically rejected because the team is now full."
+                        )
 
             return Response({"message": "Student added to the team."}, status=200)
 
@@ -367,6 +413,101 @@ class RejectJoinRequestView(APIView):
             return Response({"error": "Team or join request not found."}, status=404)
 
 
+class BulkJoinRequestModerationView(APIView):
+    """
+    Owner accepts and rejects many join requests in one transaction.
+
+    Body: {"accept": [student_id, ...], "reject": [student_id, ...]}.
+    Accepts are applied in the given order until the team is full; the rest
+    are reported as "team_full". The response lists the outcome per student.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @staticmethod
+    def _ids(data, key):
+        value = data.get(key, [])
+        if not isinstance(value, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in value):
+            raise ValueError(key)
+        return list(dict.fromkeys(value))
+
+    def post(self, request, pk):
+        try:
+            accept_ids = self._ids(request.data, "accept")
+            reject_ids = self._ids(request.data, "reject")
+        except ValueError as exc:
+            return Response({"error": f"'{exc}' must be a list of student ids."}, status=400)
+
+        if not accept_ids and not reject_ids:
+            return Response({"error": "Nothing to moderate."}, status=400)
+        if set(accept_ids) & set(reject_ids):
+            return Response({"error": "A student can't be both accepted and rejected."}, status=400)
+
+        with transaction.atomic(), NotificationOutbox() as outbox:
+            # 🔒 Одна блокировка команды на весь пакет
+            try:
+                team = Team.objects.select_for_update(of=("self",)).select_related("thesis_topic").get(pk=pk)
+            except Team.DoesNotExist:
+                return Response({"error": "Team not found."}, status=404)
+            if team.owner != request.user:
+                return Response({"error": "Only the owner can moderate requests."}, status=403)
+
+            pending = set(
+                JoinRequest.objects.filter(team=team, status="pending", student_id__in=accept_ids + reject_ids)
+                .values_list("student_id", flat=True)
+            )
+
+            results = []
+            accepted, rejected = [], []
+            free = MAX_TEAM_MEMBERS - team.member_count
+            for student_id in accept_ids:
+                if student_id not in pending:
+                    outcome = "not_found"
+                elif len(accepted) >= free:
+                    outcome = "team_full"
+                else:
+                    accepted.append(student_id)
+                    outcome = "accepted"
+                results.append({"student_id": student_id, "action": "accept", "result": outcome})
+            for student_id in reject_ids:
+                if student_id in pending:
+                    rejected.append(student_id)
+                results.append({
+                    "student_id": student_id, "action": "reject",
+                    "result": "rejected" if student_id in pending else "not_found",
+                })
+
+            if not team.add_members(accepted):
+                return Response({"error": "Team capacity changed, try again."}, status=409)
+
+            title = team.thesis_topic.title
+            JoinRequest.objects.filter(team=team, student_id__in=accepted).update(status="accepted")
+            for student_id in accepted:
+                outbox.add(student_id, f"Your request to join '{title}' was accepted.")
+
+            # 💡 Команда заполнена — остальные pending заявки закрываются вместе с отклонёнными
+            auto_rejected = []
+            if team.is_full:
+                auto_rejected = list(
+                    JoinRequest.objects.filter(team=team, status="pending")
+                    .exclude(student_id__in=rejected).values_list("student_id", flat=True)
+                )
+            JoinRequest.objects.filter(team=team, status="pending", student_id__in=rejected + auto_rejected) \
+                .update(status="rejected")
+            for student_id in rejected:
+                outbox.add(student_id, f"Your request to join '{title}' was rejected.")
+            for student_id in auto_rejected:
+                outbox.add(
+                    student_id,
+                    f"Your request to join '{title}' was automatically rejected because the team is now full."
+                )
+
+        return Response({
+            "results": results,
+            "auto_rejected": auto_rejected,
+            "member_count": team.member_count,
+        }, status=200)
+
+
 class CreateSupervisorRequestView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -393,7 +534,8 @@ class CreateSupervisorRequestView(APIView):
         SupervisorRequest.objects.create(team=team, supervisor=supervisor)
 
         # Уведомление
-        send_notification(supervisor.user, f"{user.student_profile.first_name} requests you as supervisor.")
+        send_notification(supervisor.user, f"{user.student_profile.first_name} requests you as supervisor.",
+                          digest_key="supervisor_request")
 
         return Response({"message": "Request sent."})
 
@@ -417,21 +559,28 @@ class AcceptSupervisorRequestView(APIView):
         if not hasattr(request.user, "supervisor_profile"):
             return Response({"error": "Only supervisors can accept."}, status=403)
 
-        try:
-            req = SupervisorRequest.objects.get(pk=request_id, supervisor=request.user.supervisor_profile)
-        except SupervisorRequest.DoesNotExist:
-            return Response({"error": "Request not found."}, status=404)
+        with transaction.atomic():
+            # 🔒 Профиль блокируется, как в approve_team: параллельные accept не превысят лимит
+            supervisor = SupervisorProfile.objects.select_for_update().get(pk=request.user.supervisor_profile.pk)
+            try:
+                req = SupervisorRequest.objects.select_for_update().select_related("team") \
+                    .get(pk=request_id, supervisor=supervisor)
+            except SupervisorRequest.DoesNotExist:
+                return Response({"error": "Request not found."}, status=404)
 
-        team = req.team
-        team.supervisor = request.user.supervisor_profile
-        team.owner = request.user
-        team.status = 'accepted'
-        team.save()
+            team = req.team
+            if team.supervisor_id != supervisor.pk and supervisor.supervised_team_count >= SUPERVISOR_TEAM_LIMIT:
+                return Response({"error": "Supervisor cannot own more than 10 teams."}, status=400)
 
-        req.status = 'accepted'
-        req.save()
+            team.supervisor = supervisor
+            team.owner = request.user
+            team.status = 'accepted'
+            team.save()
 
-        send_notification(team.owner, "Your supervisor request was accepted!")
+            req.status = 'accepted'
+            req.save()
+
+            send_notification(team.owner, "Your supervisor request was accepted!")
         return Response({"message": "Team approved and assigned."})
 
 
@@ -467,6 +616,15 @@ class CancelSupervisorRequestView(APIView):
             return Response({"error": "No pending request."}, status=404)
 
 
+TOP_PROJECTS_CACHE_KEY = "teams:top_projects"
+TOP_PROJECTS_CACHE_TTL = 60
+TOP_PROJECTS_MAX = 50
+
+
+def invalidate_top_projects():
+    cache.delete(TOP_PROJECTS_CACHE_KEY)
+
+
 class LikeToggleView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -477,19 +635,49 @@ class LikeToggleView(APIView):
         except Team.DoesNotExist:
             return Response({"error": "Team not found"}, status=404)
 
-        like, created = Like.objects.get_or_create(user=user, team=team)
+        with transaction.atomic():
+            like, created = Like.objects.get_or_create(user=user, team=team)
+            if created:
+                Team.objects.filter(pk=team.pk).update(like_count=F("like_count") + 1)
+            else:
+                # Считаем только реально удалённую строку — параллельный unlike не уменьшит счётчик дважды
+                deleted, _ = Like.objects.filter(pk=like.pk).delete()
+                if deleted:
+                    Team.objects.filter(pk=team.pk, like_count__gt=0).update(like_count=F("like_count") - 1)
+            transaction.on_commit(invalidate_top_projects)
+
         if not created:
-            like.delete()
             return Response({"message": "Unliked"}, status=200)
         return Response({"message": "Liked"}, status=201)
 
 
+class TopProjectsView(APIView):
+    """ Most liked projects, ranked by the maintained like_count """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        limit = _limit_param(request, maximum=TOP_PROJECTS_MAX)
+
+        ranked_ids = cache.get(TOP_PROJECTS_CACHE_KEY)
+        if ranked_ids is None:
+            ranked_ids = list(
+                Team.objects.filter(like_count__gt=0).order_by("-like_count", "id")
+                .values_list("id", flat=True)[:TOP_PROJECTS_MAX]
+            )
+            cache.set(TOP_PROJECTS_CACHE_KEY, ranked_ids, timeout=TOP_PROJECTS_CACHE_TTL)
+
+        ranked_ids = ranked_ids[:limit]
+        teams = with_team_relations(Team.objects.filter(id__in=ranked_ids), user=request.user).in_bulk()
+        ordered = [teams[team_id] for team_id in ranked_ids if team_id in teams]
+        return Response(TeamSerializer(ordered, many=True).data)
+
+
 class LikedProjectsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         liked_team_ids = Like.objects.filter(user=request.user).values_list("team_id", flat=True)
-        teams = Team.objects.filter(id__in=liked_team_ids)
+        teams = with_team_relations(Team.objects.filter(id__in=liked_team_ids), user=request.user)
         serializer = TeamSerializer(teams, many=True)
         return Response(serializer.data)
 
@@ -513,7 +701,7 @@ class LeaveTeamView(APIView):
         was_owner = team.owner == user
 
         # Удаляем участника
-        team.members.remove(student)
+        team.remove_member(student)
 
         # ✅ Обнуляем created_by_student, если студент был автором темы
         if team.thesis_topic.created_by_student == student:
@@ -524,7 +712,7 @@ class LeaveTeamView(APIView):
         if not was_owner:
             send_notification(team.owner, f"{student.first_name} {student.last_name} has left your team.")
 
-        if team.members.count() == 0 and team.supervisor is None:
+        if team.member_count == 0 and team.supervisor is None:
             thesis = team.thesis_topic
             team.delete()
             thesis.delete()
@@ -564,7 +752,7 @@ class SupervisorDeleteTeamView(APIView):
         if team.supervisor is None or team.supervisor.user != user:
             return Response({"error": "You are not the supervisor of this team."}, status=403)
 
-        if team.members.exists():
+        if team.member_count > 0:
             return Response({"error": "You cannot delete the team while it has members."}, status=400)
 
         thesis = team.thesis_topic
@@ -600,11 +788,9 @@ class RemoveTeamMemberView(APIView):
         except StudentProfile.DoesNotExist:
             return Response({"error": "Student not found."}, status=404)
 
-        if student not in team.members.all():
-            return Response({"error": "Student is not in the team."}, status=400)
-
         # Удаляем участника
-        team.members.remove(student)
+        if not team.remove_member(student):
+            return Response({"error": "Student is not in the team."}, status=400)
 
         # ✅ Обнуляем created_by_student, если студент был автором темы
         if team.thesis_topic.created_by_student == student:
@@ -646,7 +832,7 @@ class ApprovedTeamsForDeanView(generics.ListAPIView):
         user = self.request.user
         if user.role != "Dean Office":
             return Team.objects.none()
-        return Team.objects.filter(status="approved")
+        return with_team_relations(Team.objects.filter(status="approved"), user=user)
 
 
 class ExportApprovedTeamsExcelView(APIView):
@@ -659,6 +845,160 @@ class ExportApprovedTeamsExcelView(APIView):
         if user.role != "Dean Office":
             return Response({"error": "Only Dean Office can export."}, status=403)
 
+        # ✅ ?mode=stream — write-only книга, память не растёт с количеством команд
+        if request.query_params.get("mode") == "stream":
+            return stream_excel_for_approved_teams(request)
+
         # ✅ Просто передаем request, teams уже внутри собираются
         excel_response = generate_excel_for_approved_teams(request)
         return excel_response
+
+
+def _export_job_data(job):
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "error": job["error"],
+    }
+
+
+class ExportJobCreateView(APIView):
+    """ Starts building the approved-teams workbook in the background """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.role != "Dean Office":
+            return Response({"error": "Only Dean Office can export."}, status=403)
+
+        job = submit_export_job(request.user)
+        return Response(_export_job_data(job), status=200 if job["status"] == "done" else 202)
+
+
+class ExportJobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        if request.user.role != "Dean Office":
+            return Response({"error": "Only Dean Office can export."}, status=403)
+
+        job = get_job(job_id)
+        if job is None:
+            return Response({"error": "Export job not found."}, status=404)
+        return Response(_export_job_data(job))
+
+
+class ExportJobDownloadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        if request.user.role != "Dean Office":
+            return Response({"error": "Only Dean Office can export."}, status=403)
+
+        job = get_job(job_id)
+        if job is None:
+            return Response({"error": "Export job not found."}, status=404)
+        if job["status"] != "done":
+            return Response({"error": "Export is not ready yet.", "status": job["status"]}, status=409)
+
+        path = job_file_path(job)
+        if path is None:
+            return Response({"error": "Export file has expired, start a new export."}, status=410)
+
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=EXPORT_FILENAME)
+
+
+def _limit_param(request, default=10, maximum=50):
+    try:
+        return max(1, min(int(request.query_params.get("limit", default)), maximum))
+    except ValueError:
+        return default
+
+
+class RecommendedTeamsView(APIView):
+    """ Pending teams with free places ranked by how well the current student's skills fill their gaps """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not hasattr(request.user, "student_profile"):
+            return Response({"error": "Only students can get team recommendations."}, status=403)
+
+        student = request.user.student_profile
+        if Team.objects.filter(members=student).exists():
+            return Response({"error": "You are already in a team."}, status=400)
+
+        ranked = recommend_teams(student, limit=_limit_param(request))
+        teams = with_team_relations(Team.objects.filter(id__in=[row[0] for row in ranked]), user=request.user).in_bulk()
+
+        return Response([
+            {
+                "team": TeamSerializer(teams[team_id]).data,
+                "fills_gap": fills_gap,
+                "matched_skill_count": matched_count,
+                "matched_skill_ids": mask_skill_ids(matched),
+            }
+            for team_id, fills_gap, matched_count, matched in ranked if team_id in teams
+        ])
+
+
+class CandidateStudentsView(APIView):
+    """ Students without a team ranked by how many of the team's missing skills they cover """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        team = get_object_or_404(Team.objects.select_related("supervisor"), pk=pk)
+        is_supervisor = team.supervisor is not None and team.supervisor.user_id == request.user.id
+        if team.owner_id != request.user.id and not is_supervisor:
+            return Response({"error": "Only the owner or supervisor can view candidates."}, status=403)
+
+        ranked = recommend_students(team, limit=_limit_param(request))
+        students = StudentProfile.objects.filter(pk__in=[row[0] for row in ranked]) \
+            .select_related("user").prefetch_related("skills").in_bulk()
+
+        return Response([
+            {
+                "student": StudentProfileSerializer(students[student_id]).data,
+                "fills_gap": fills_gap,
+                "matched_skill_count": matched_count,
+                "gap_skill_ids": mask_skill_ids(fills),
+            }
+            for student_id, fills_gap, matched_count, fills in ranked if student_id in students
+        ])
+
+
+class SupervisorMatchesView(APIView):
+    """ Supervisors with free places ranked by skill overlap with the current owner's team topic """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not hasattr(request.user, "student_profile"):
+            return Response({"error": "Only students can look for supervisors."}, status=403)
+
+        # Владелец может владеть несколькими командами — тогда команда указывается явно
+        owned = Team.objects.filter(owner=request.user)
+        team_id = request.query_params.get("team")
+        if team_id is not None:
+            if not team_id.isdigit():
+                return Response({"error": "team must be a team id."}, status=400)
+            owned = owned.filter(pk=team_id)
+        teams = list(owned[:2])
+        if not teams:
+            if team_id is not None:
+                return Response({"error": "Team not found or you are not its owner."}, status=404)
+            return Response({"error": "Only team owners can look for supervisors."}, status=403)
+        if len(teams) > 1:
+            return Response({"error": "You own several teams; pass ?team=<id>."}, status=400)
+        team = teams[0]
+
+        ranked = recommend_supervisors(team, limit=_limit_param(request))
+        supervisors = SupervisorProfile.objects.filter(pk__in=[row[0] for row in ranked]) \
+            .select_related("user").in_bulk()
+
+        return Response([
+            {
+                "supervisor": SupervisorShortSerializer(supervisors[supervisor_id]).data,
+                "matched_skill_count": matched_count,
+                "matched_skill_ids": mask_skill_ids(matched),
+                "remaining_capacity": remaining,
+            }
+            for supervisor_id, matched_count, remaining, matched in ranked if supervisor_id in supervisors
+        ])
@@ -34,7 +34,7 @@ class ThesisTopicSerializer(serializers.ModelSerializer):
         # ==== SUPERVISOR ====
         elif hasattr(user, 'supervisor_profile'):
             created_topics_count = ThesisTopic.objects.filter(created_by_supervisor=user.supervisor_profile).count()
-            supervised_teams_count = Team.objects.filter(supervisor=user.supervisor_profile).count()
+            supervised_teams_count = user.supervisor_profile.supervised_team_count
 
             total = created_topics_count + supervised_teams_count
             if total >= 10:
@@ -63,7 +63,7 @@ class ThesisTopicSerializer(serializers.ModelSerializer):
         )
 
         if hasattr(user, 'student_profile'):
-            team.members.add(user.student_profile)
+            team.add_member(user.student_profile)
 
         if hasattr(user, 'supervisor_profile'):
             team.supervisor = user.supervisor_profile
@@ -1,3 +1,24 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from DTest.testing import PaginationMixin
+from users.models import CustomUser
+from .models import ThesisTopic
+
+
+class ThesisTopicPaginationTests(PaginationMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        supervisor = CustomUser.objects.create_user(email="super.visor@example.com", role="Supervisor")
+        for i in range(5):
+            ThesisTopic.objects.create(title=f"Topic {i}", description="...",
+                                       created_by_supervisor=supervisor.supervisor_profile)
+
+    def test_cursor_round_trip(self):
+        pages = self.walk(self.client, "/api/topics/", page_size=2)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual([topic_id for page in pages for topic_id in page],
+                         list(ThesisTopic.objects.order_by("id").values_list("id", flat=True)))
+
+    def test_page_size_is_clamped(self):
+        self.assertPageSizeClamped(self.client, "/api/topics/")
@@ -3,6 +3,7 @@ from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.exceptions import PermissionDenied
 
+from DTest.pagination import ThesisTopicPagination
 from teams.models import Team
 from .models import ThesisTopic
 from .serializers import ThesisTopicSerializer
@@ -40,9 +41,10 @@ class ThesisTopicListView(generics.ListAPIView):
     
     Lists all thesis topics in the system. No authentication required.
     """
-    queryset = ThesisTopic.objects.all()
+    queryset = ThesisTopic.objects.prefetch_related("required_skills")
     serializer_class = ThesisTopicSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = ThesisTopicPagination
     
     @swagger_auto_schema(
         operation_summary="List thesis topics",
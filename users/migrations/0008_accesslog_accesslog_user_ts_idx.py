@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_customuser_last_failed_login'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['user', '-timestamp'], name='accesslog_user_ts_idx'),
+        ),
+    ]
@@ -68,5 +68,11 @@ class AccessLog(models.Model):
     user_agent = models.TextField(null=True, blank=True)
     timestamp = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # A user's login history, newest first (admin and audits)
+            models.Index(fields=['user', '-timestamp'], name='accesslog_user_ts_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.email} — {self.action.upper()} @ {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
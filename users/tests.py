@@ -1,3 +1,13 @@
 from django.test import TestCase
 
-# Create your tests here.
+from DTest.testing import QueryPlanMixin
+from .models import CustomUser, AccessLog
+
+
+class AccessLogIndexTests(QueryPlanMixin, TestCase):
+    def test_user_history_uses_composite_index(self):
+        users = [CustomUser.objects.create_user(email=f"user{i}@example.com", role="Student") for i in range(20)]
+        AccessLog.objects.bulk_create([AccessLog(user=user, action="login") for user in users for _ in range(20)])
+        self.analyze()
+
+        self.assertUsesIndex(AccessLog.objects.filter(user=users[0]).order_by("-timestamp"), "accesslog_user_ts_idx")